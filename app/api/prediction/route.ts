@@ -1,29 +1,29 @@
 import { NextResponse } from 'next/server';
 import path from 'path';
 import fs from 'fs';
-import os from 'os';
-import { exec } from 'child_process';
-import { promisify } from 'util';
+import { callPredictor, callPredictorRaw } from '@/lib/ml/predictor-worker';
 
-interface PredictionResult {
-  disease: string;
-  confidence: number;
+interface SymptomVocabulary {
+  version: string;
+  symptoms?: string[];
+  not_modified?: boolean;
 }
 
-const execPromise = promisify(exec);
-// Try different Python executable names in order
-const pythonExecutables = ['python3', 'python', 'py'];
+interface SymptomCompletions {
+  version: string;
+  matches: string[];
+}
 
-async function findPythonExecutable(): Promise<string> {
-  for (const pythonExec of pythonExecutables) {
-    try {
-      await execPromise(`${pythonExec} --version`);
-      return pythonExec;
-    } catch (error) {
-      continue;
-    }
+const DEFAULT_COMPLETION_LIMIT = 10;
+const MAX_COMPLETION_LIMIT = 100;
+
+// The worker only accepts a positive integer limit
+function completionLimit(value: string | null): number {
+  const limit = Math.floor(Number(value));
+  if (!Number.isFinite(limit) || limit < 1) {
+    return DEFAULT_COMPLETION_LIMIT;
   }
-  return 'python3'; // Default to python3 if no executable found
+  return Math.min(limit, MAX_COMPLETION_LIMIT);
 }
 
 // List all files in a directory for debugging purposes
@@ -35,11 +35,8 @@ async function listDirContents(dir: string): Promise<string[]> {
   }
 }
 
-export async function GET() {
+export async function GET(req: Request) {
   try {
-    const pythonExec = await findPythonExecutable();
-    console.log(`Using Python executable: ${pythonExec}`);
-
     // Check if data directory exists
     const dataDir = path.join(process.cwd(), 'public/data');
     if (!fs.existsSync(dataDir)) {
@@ -66,95 +63,53 @@ export async function GET() {
       }, { status: 500 });
     }
 
-    // Create a temporary file with the Python script
-    const tempFile = path.join(os.tmpdir(), 'symptoms-script.py');
-    const pythonCode = `
-import sys
-import os
-import json
-
-# Print environment for debugging
-print("PYTHON DEBUG INFO:", file=sys.stderr)
-print(f"Python version: {sys.version}", file=sys.stderr)
-print(f"Current directory: {os.getcwd()}", file=sys.stderr)
-print(f"Data path: {os.path.join(os.getcwd(), 'public/data')}", file=sys.stderr)
-data_files = os.listdir(os.path.join(os.getcwd(), 'public/data'))
-print(f"Data files: {data_files}", file=sys.stderr)
-
-sys.path.append('${path.join(process.cwd(), 'lib/ml')}')
-try:
-    import disease_predictor
-    symptoms = disease_predictor.get_all_symptoms()
-    print(json.dumps(symptoms))
-except Exception as e:
-    print(f"Error importing or running disease_predictor: {str(e)}", file=sys.stderr)
-    # Provide a fallback set of symptoms
-    fallback_symptoms = [
-        "itching", "skin_rash", "nodal_skin_eruptions", "continuous_sneezing", "shivering",
-        "chills", "joint_pain", "stomach_pain", "acidity", "ulcers_on_tongue", "vomiting",
-        "burning_micturition", "fatigue", "weight_loss", "cough", "high_fever",
-        "breathlessness", "sweating", "headache", "yellowish_skin", "dark_urine",
-        "nausea", "loss_of_appetite", "abdominal_pain", "diarrhoea", "mild_fever",
-        "yellowing_of_eyes", "swelled_lymph_nodes", "malaise", "blurred_vision"
-    ]
-    print(json.dumps(fallback_symptoms))
-    `;
-    
-    fs.writeFileSync(tempFile, pythonCode);
-    console.log(`Created temp file at: ${tempFile}`);
-
-    try {
-      console.log(`Executing Python script: ${pythonExec} ${tempFile}`);
-      const { stdout, stderr } = await execPromise(`${pythonExec} ${tempFile}`);
-      
-      if (stderr) {
-        console.error(`Python stderr: ${stderr}`);
-      }
-      
-      console.log(`Python stdout length: ${stdout.length}`);
-      if (stdout.trim().length === 0) {
-        console.error('Python script returned empty output');
-        return NextResponse.json({
-          error: 'No output from Python script',
-          debug: { stderr }
-        }, { status: 500 });
-      }
-      
-      let symptoms;
+    // ?q= returns ranked autocomplete suggestions instead of the whole list
+    const searchParams = new URL(req.url).searchParams;
+    const query = searchParams.get('q');
+    if (query !== null) {
+      const limit = completionLimit(searchParams.get('limit'));
       try {
-        symptoms = JSON.parse(stdout.trim());
-      } catch (parseError) {
-        console.error(`Failed to parse JSON from stdout: ${stdout}`);
+        const completions = await callPredictor<SymptomCompletions>('complete', { prefix: query, limit });
+        return NextResponse.json(completions);
+      } catch (error: any) {
+        console.error('Python worker error:', error);
         return NextResponse.json({
-          error: 'Failed to parse symptoms JSON',
-          debug: { stdout, stderr }
+          error: 'Failed to complete symptoms',
+          message: error.message
         }, { status: 500 });
       }
-      
+    }
+
+    try {
+      // The vocabulary version doubles as an ETag so unchanged lists are not re-sent
+      const ifNoneMatch = req.headers.get('if-none-match')?.replace(/^W\//, '').replace(/"/g, '');
+      const vocabulary = await callPredictor<SymptomVocabulary>('symptoms', { if_none_match: ifNoneMatch });
+      const headers = {
+        ETag: `"${vocabulary.version}"`,
+        'Cache-Control': 'no-cache',
+      };
+
+      if (vocabulary.not_modified) {
+        return new NextResponse(null, { status: 304, headers });
+      }
+
+      const symptoms = vocabulary.symptoms;
       if (!Array.isArray(symptoms) || symptoms.length === 0) {
         console.error(`Invalid symptoms data returned: ${JSON.stringify(symptoms)}`);
         return NextResponse.json({
           error: 'Invalid symptoms data returned',
-          debug: { symptoms, stderr }
+          debug: { symptoms }
         }, { status: 500 });
       }
       
       console.log(`Successfully got ${symptoms.length} symptoms`);
-      return NextResponse.json({ symptoms });
+      return NextResponse.json({ symptoms, version: vocabulary.version }, { headers });
     } catch (error: any) {
-      console.error('Python execution error:', error);
+      console.error('Python worker error:', error);
       return NextResponse.json({
         error: 'Failed to fetch symptoms',
-        message: error.message,
-        debug: { cmd: `${pythonExec} ${tempFile}` }
+        message: error.message
       }, { status: 500 });
-    } finally {
-      // Clean up temp file
-      try {
-        fs.unlinkSync(tempFile);
-      } catch (e) {
-        console.error('Failed to delete temp file:', e);
-      }
     }
   } catch (error: any) {
     console.error('Error fetching symptoms:', error);
@@ -176,65 +131,21 @@ export async function POST(req: Request) {
       );
     }
 
-    const pythonExec = await findPythonExecutable();
-
-    // Create a temporary file with the Python script
-    const tempFile = path.join(os.tmpdir(), 'prediction-script.py');
-    const pythonCode = `
-import sys
-import os
-import json
-
-# Print environment for debugging
-print("PYTHON DEBUG INFO:", file=sys.stderr)
-print(f"Python version: {sys.version}", file=sys.stderr)
-print(f"Current directory: {os.getcwd()}", file=sys.stderr)
-
-sys.path.append('${path.join(process.cwd(), 'lib/ml')}')
-try:
-    import disease_predictor
-    symptoms = json.loads('${JSON.stringify(symptoms)}')
-    result = disease_predictor.predict(symptoms)
-    print(json.dumps(result))
-except Exception as e:
-    print(f"Error predicting disease: {str(e)}", file=sys.stderr)
-    # Provide a fallback prediction
-    print(json.dumps({
-        "disease": "Unknown",
-        "confidence": 0,
-        "error": str(e)
-    }))
-    `;
-    
-    fs.writeFileSync(tempFile, pythonCode);
-
     try {
-      const { stdout, stderr } = await execPromise(`${pythonExec} ${tempFile}`);
+      // The worker's JSON is sent on as is, without parsing and re-serializing it
+      const result = await callPredictorRaw('predict', { symptoms });
       
-      if (stderr) {
-        console.error(`Python stderr: ${stderr}`);
+      if (result.includes('"error": ')) {
+        console.error(`Python error: ${result}`);
       }
       
-      const result = JSON.parse(stdout.trim());
-      
-      if (result.error) {
-        console.error(`Python error: ${result.error}`);
-      }
-      
-      return NextResponse.json(result);
+      return new NextResponse(result, { headers: { 'Content-Type': 'application/json' } });
     } catch (error: any) {
-      console.error('Python execution error:', error);
+      console.error('Python worker error:', error);
       return NextResponse.json({
         error: 'Failed to process prediction',
         message: error.message
       }, { status: 500 });
-    } finally {
-      // Clean up temp file
-      try {
-        fs.unlinkSync(tempFile);
-      } catch (e) {
-        console.error('Failed to delete temp file:', e);
-      }
     }
   } catch (error: any) {
     console.error('Prediction error:', error);
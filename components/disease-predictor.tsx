@@ -11,6 +11,9 @@ interface PredictionResult {
   error?: string;
 }
 
+// Wait for a pause in typing before asking the server for suggestions
+const SUGGESTION_DEBOUNCE_MS = 150;
+
 export default function DiseasePredictor() {
   const [symptoms, setSymptoms] = useState<string[]>([]);
   const [selectedSymptoms, setSelectedSymptoms] = useState<string[]>([]);
@@ -19,6 +22,7 @@ export default function DiseasePredictor() {
   const [error, setError] = useState<string | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [isLoadingSymptoms, setIsLoadingSymptoms] = useState(true);
+  const [suggestions, setSuggestions] = useState<string[] | null>(null);
 
   useEffect(() => {
     const fetchSymptoms = async () => {
@@ -62,6 +66,40 @@ export default function DiseasePredictor() {
     fetchSymptoms();
   }, []);
 
+  // Ranked server-side suggestions (word, synonym and typo matches) for the search box
+  useEffect(() => {
+    const query = searchTerm.trim();
+    if (!query) {
+      setSuggestions(null);
+      return;
+    }
+
+    const controller = new AbortController();
+    const fetchSuggestions = async () => {
+      try {
+        const response = await fetch(`/api/prediction?q=${encodeURIComponent(query)}&limit=50`, {
+          signal: controller.signal,
+        });
+        if (!response.ok) {
+          throw new Error('Failed to fetch suggestions');
+        }
+        const data = await response.json();
+        setSuggestions(Array.isArray(data.matches) ? data.matches : null);
+      } catch (err: any) {
+        if (err.name !== 'AbortError') {
+          // Fall back to filtering the loaded list
+          setSuggestions(null);
+        }
+      }
+    };
+
+    const timer = setTimeout(fetchSuggestions, SUGGESTION_DEBOUNCE_MS);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchTerm]);
+
   const handleSymptomToggle = (symptom: string) => {
     setSelectedSymptoms(prev =>
       prev.includes(symptom)
@@ -108,7 +146,7 @@ export default function DiseasePredictor() {
     }
   };
 
-  const filteredSymptoms = symptoms.filter(symptom =>
+  const filteredSymptoms = suggestions ?? symptoms.filter(symptom =>
     symptom.toLowerCase().replace(/_/g, ' ').includes(searchTerm.toLowerCase())
   );
 
@@ -0,0 +1,350 @@
+"""Benchmark the disease prediction engines.
+
+For the shipped datasets and for synthetic copies scaled up in diseases and
+symptoms, this reports per engine:
+
+- cold start: module import, knowledge base load and model load (once with
+  an empty artifact cache, i.e. including training, and once with the
+  artifact already built)
+- warm single-query latency percentiles
+- batch throughput
+
+Every measurement runs in a fresh interpreter with its own data and cache
+directory, so runs do not disturb each other or the real model cache.
+Results are written as JSON so runs can be compared over time.
+
+    python lib/ml/benchmark.py --scales 1,10,100 --output bench.json
+"""
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.normpath(os.path.join(ML_DIR, '../..'))
+
+# Files of a complete data directory and where the shipped copy lives
+DATA_FILES = {
+    'dataset.csv': 'backend/dataset',
+    'disease_description.csv': 'backend/dataset',
+    'disease_precaution.csv': 'backend/dataset',
+    'symptom_severity.csv': 'backend/dataset',
+    'Training.csv': 'public/data',
+    'Testing.csv': 'public/data',
+}
+
+ENGINES = ['predict', 'naive_bayes', 'clinical_relevance', 'severity', 'pattern_matching']
+
+
+def _read_rows(path):
+    with open(path, 'r', newline='') as f:
+        return list(csv.reader(f))
+
+
+def _write_rows(path, rows):
+    with open(path, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+def copy_shipped_dataset(target_dir):
+    for filename, source_dir in DATA_FILES.items():
+        shutil.copy(os.path.join(REPO_DIR, source_dir, filename), os.path.join(target_dir, filename))
+
+
+def write_scaled_dataset(target_dir, scale, with_training=True, rows_per_disease=None):
+    """Write a synthetic data directory with scale times the diseases and symptoms.
+
+    Each disease is replicated scale times. Replicas use renamed copies of
+    their symptoms, except every tenth symptom, which stays shared between
+    replicas so posting lists grow as they would in a larger catalogue.
+    With rows_per_disease, the training matrices keep only that many rows of
+    each disease; the model shape (diseases x symptoms) stays the same.
+    """
+    def source(filename):
+        return os.path.join(REPO_DIR, DATA_FILES[filename], filename)
+
+    def scaled(name, replica):
+        return name if replica == 0 else f"{name} #{replica}"
+
+    shared = {}
+
+    def scaled_symptom(symptom, replica):
+        symptom = symptom.strip()
+        if symptom not in shared:
+            shared[symptom] = len(shared) % 10 == 0
+        return symptom if shared[symptom] or replica == 0 else f"{symptom}_{replica}"
+
+    dataset = _read_rows(source('dataset.csv'))
+    rows = [dataset[0]]
+    for replica in range(scale):
+        for row in dataset[1:]:
+            rows.append([scaled(row[0].strip(), replica)] + [
+                value if not value or value.strip().lower() == 'null' else scaled_symptom(value, replica)
+                for value in row[1:]
+            ])
+    _write_rows(os.path.join(target_dir, 'dataset.csv'), rows)
+
+    for filename in ('disease_description.csv', 'disease_precaution.csv'):
+        table = _read_rows(source(filename))
+        _write_rows(os.path.join(target_dir, filename), [table[0]] + [
+            [scaled(row[0].strip(), replica)] + row[1:] for replica in range(scale) for row in table[1:]
+        ])
+
+    severity = _read_rows(source('symptom_severity.csv'))
+    seen = set()
+    severity_rows = [severity[0]]
+    for replica in range(scale):
+        for row in severity[1:]:
+            symptom = scaled_symptom(row[0], replica)
+            if symptom not in seen:
+                seen.add(symptom)
+                severity_rows.append([symptom] + row[1:])
+    _write_rows(os.path.join(target_dir, 'symptom_severity.csv'), severity_rows)
+
+    if not with_training:
+        return
+
+    # One-hot training/testing matrices: replica blocks along the diagonal
+    for filename in ('Training.csv', 'Testing.csv'):
+        table = _read_rows(source(filename))
+        header = table[0]
+        label_col = header.index('prognosis')
+        if rows_per_disease is not None:
+            kept = {}
+            body = []
+            for row in table[1:]:
+                label = row[label_col].strip()
+                if kept.get(label, 0) < rows_per_disease:
+                    kept[label] = kept.get(label, 0) + 1
+                    body.append(row)
+            table = [header] + body
+        symptoms = [name for idx, name in enumerate(header) if idx != label_col]
+        columns = [scaled_symptom(name, replica) for replica in range(scale) for name in symptoms]
+        columns = list(dict.fromkeys(columns))
+        column_index = {name: idx for idx, name in enumerate(columns)}
+
+        with open(os.path.join(target_dir, filename), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns + ['prognosis'])
+            for replica in range(scale):
+                for row in table[1:]:
+                    values = ['0'] * len(columns)
+                    for idx, name in enumerate(header):
+                        if idx != label_col and row[idx].strip() == '1':
+                            values[column_index[scaled_symptom(name, replica)]] = '1'
+                    writer.writerow(values + [scaled(row[label_col].strip(), replica)])
+
+
+def percentiles(samples_ms):
+    """Latency summary of the samples; every value is None when there are none"""
+    samples = sorted(samples_ms)
+    if not samples:
+        return dict.fromkeys(("p50", "p90", "p99", "mean", "max"))
+
+    def pick(fraction):
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    return {
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "mean": sum(samples) / len(samples),
+        "max": samples[-1]
+    }
+
+
+def _measure(with_ml, queries, batch_size, seed):
+    """Body of a measurement subprocess; prints its results as JSON"""
+    started = time.perf_counter()
+    sys.path.insert(0, ML_DIR)
+    import disease_predictor as dp
+    imported = time.perf_counter()
+
+    dp.KB.load_all()
+    loaded = time.perf_counter()
+
+    cold = {
+        "import_ms": (imported - started) * 1000,
+        "knowledge_base_ms": (loaded - imported) * 1000,
+    }
+    if with_ml:
+        if not dp.ml_available():
+            with_ml = False
+        else:
+            dp.load_model()
+            cold["model_ms"] = (time.perf_counter() - loaded) * 1000
+    # Naive Bayes needs only NumPy, so it is measured at every scale
+    with_naive_bayes = dp.numpy_available()
+    if with_naive_bayes:
+        naive_bayes_started = time.perf_counter()
+        dp.load_naive_bayes()
+        cold["naive_bayes_ms"] = (time.perf_counter() - naive_bayes_started) * 1000
+    cold["total_ms"] = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(seed)
+    diseases = [symptoms for symptoms in dp.KB.disease_symptom_map.values() if symptoms]
+    inputs = []
+    for _ in range(max(queries, batch_size)):
+        symptoms = rng.choice(diseases)
+        inputs.append(rng.sample(symptoms, min(len(symptoms), rng.randint(2, 5))))
+
+    single = {
+        'predict': dp.predict,
+        'naive_bayes': dp.predict_with_naive_bayes,
+        'clinical_relevance': dp.predict_with_clinical_relevance,
+        'severity': dp.predict_with_severity,
+        'pattern_matching': dp.predict_with_pattern_matching,
+    }
+    batched = {
+        'predict': dp.predict_batch,
+        'naive_bayes': dp.predict_with_naive_bayes_batch,
+        'clinical_relevance': dp.predict_with_clinical_relevance_batch,
+    }
+
+    engines = {}
+    for engine in ENGINES:
+        if engine == 'predict' and not with_ml:
+            engines[engine] = {"skipped": "forest not measured at this scale"}
+            continue
+        if engine == 'naive_bayes' and not with_naive_bayes:
+            engines[engine] = {"skipped": "NumPy is not installed"}
+            continue
+
+        predict = single[engine]
+        if inputs:
+            predict(inputs[0])  # first call builds lazy indexes
+        latencies = []
+        for symptoms in inputs[:queries]:
+            start = time.perf_counter()
+            predict(symptoms)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        batch = inputs[:batch_size]
+        start = time.perf_counter()
+        if engine in batched:
+            batched[engine](batch)
+        else:
+            for symptoms in batch:
+                predict(symptoms)
+        elapsed = time.perf_counter() - start
+
+        engines[engine] = {
+            "latency_ms": percentiles(latencies),
+            "batch": {
+                "size": len(batch),
+                "vectorized": engine in batched,
+                "seconds": elapsed,
+                "rows_per_sec": len(batch) / elapsed if elapsed else None
+            }
+        }
+
+    print(json.dumps({
+        "diseases": len(dp.KB.disease_symptom_map),
+        "symptoms": len(dp.KB.all_symptoms),
+        "cold_start": cold,
+        "engines": engines
+    }))
+
+
+def _run_measurement(data_dir, cache_dir, with_ml, queries, batch_size, seed):
+    env = dict(os.environ)
+    env.update({
+        'MEDIMIND_DATA_DIR': data_dir,
+        'MEDIMIND_CACHE_DIR': cache_dir,
+        # Measure the engines themselves, not the result cache
+        'MEDIMIND_RESULT_CACHE_SIZE': '0',
+    })
+    command = [sys.executable, os.path.abspath(__file__), '--measure',
+               '--queries', str(queries), '--batch-size', str(batch_size), '--seed', str(seed)]
+    if not with_ml:
+        command.append('--no-ml')
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark run failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def benchmark_dataset(label, prepare, with_ml, queries, batch_size, seed):
+    """Benchmark one data directory: a cold run that trains, then a cold run with the artifact and warm timings"""
+    with tempfile.TemporaryDirectory(prefix='medimind-bench-') as work_dir:
+        data_dir = os.path.join(work_dir, 'data')
+        cache_dir = os.path.join(work_dir, 'cache')
+        os.makedirs(data_dir)
+        prepare(data_dir)
+
+        print(f"[{label}] cold start with empty model cache", file=sys.stderr)
+        first = _run_measurement(data_dir, cache_dir, with_ml, 1, 1, seed)
+        print(f"[{label}] cold start with cached model, warm latency and throughput", file=sys.stderr)
+        second = _run_measurement(data_dir, cache_dir, with_ml, queries, batch_size, seed)
+
+    return {
+        "dataset": label,
+        "diseases": second["diseases"],
+        "symptoms": second["symptoms"],
+        "cold_start": {
+            "untrained": first["cold_start"],
+            "trained": second["cold_start"]
+        },
+        "engines": second["engines"]
+    }
+
+
+def main(args):
+    def option(name, default):
+        if name in args:
+            return args[args.index(name) + 1]
+        return default
+
+    queries = int(option('--queries', 200))
+    batch_size = int(option('--batch-size', 1000))
+    seed = int(option('--seed', 42))
+
+    if '--measure' in args:
+        _measure('--no-ml' not in args, queries, batch_size, seed)
+        return
+
+    scales = [int(scale) for scale in option('--scales', '1,10,100').split(',')]
+    # Training a forest on the 100x one-hot matrix takes far longer than the rest combined.
+    # Above this scale only Naive Bayes is trained, on one training row per disease.
+    ml_max_scale = int(option('--ml-max-scale', 10))
+    output = option('--output', None)
+
+    runs = []
+    for scale in scales:
+        with_ml = scale <= ml_max_scale
+        if scale == 1:
+            runs.append(benchmark_dataset('shipped', copy_shipped_dataset, with_ml, queries, batch_size, seed))
+        else:
+            runs.append(benchmark_dataset(
+                f'synthetic-x{scale}',
+                lambda data_dir, scale=scale, with_ml=with_ml: write_scaled_dataset(
+                    data_dir, scale, rows_per_disease=None if with_ml else 1
+                ),
+                with_ml, queries, batch_size, seed
+            ))
+
+    report = json.dumps({
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "queries": queries,
+        "batch_size": batch_size,
+        "runs": runs
+    }, indent=2)
+
+    if output:
+        with open(output, 'w') as f:
+            f.write(report + '\n')
+        print(f"Wrote benchmark results to {output}", file=sys.stderr)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
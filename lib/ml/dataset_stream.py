@@ -0,0 +1,133 @@
+"""Streaming ingestion of dataset.csv style case exports.
+
+Rows are read lazily and handed out in chunks, so a large export never has
+to be held in memory. DatasetAccumulator folds the chunks into per-disease
+state whose size depends on the number of distinct symptoms of a disease,
+not on how many rows (cases) mention it:
+
+- the disease's symptoms, in first-seen order
+- co-occurrence counts: in how many of the disease's rows each symptom appears
+- the number of rows of the disease
+
+and produces the (disease_symptom_map, all_symptoms) pair that
+parse_dataset_csv has always returned.
+"""
+import csv
+import os
+import sys
+import time
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def iter_dataset_chunks(dataset_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Yield lists of up to chunk_size (disease, symptoms) rows from a dataset.csv file.
+
+    progress, if given, is called after every chunk of a file spanning more
+    than one with the number of rows read so far, the bytes consumed and the
+    file size.
+    """
+    total_bytes = os.path.getsize(dataset_path)
+
+    with open(dataset_path, 'r') as f:
+        csv_reader = csv.reader(f)
+        # Skip header
+        next(csv_reader, None)
+
+        rows_read = 0
+        chunk = []
+        for row in csv_reader:
+            if not row:
+                continue
+            # Empty cells and the literal 'null' pad rows to the header width
+            chunk.append((row[0].strip(), [
+                symptom for value in row[1:]
+                if value and (symptom := value.strip()).lower() != 'null'
+            ]))
+            if len(chunk) >= chunk_size:
+                rows_read += len(chunk)
+                yield chunk
+                chunk = []
+                if progress is not None:
+                    # Position of the underlying binary buffer, accurate to its read size
+                    progress(rows_read, f.buffer.tell(), total_bytes)
+        if chunk:
+            rows_read += len(chunk)
+            yield chunk
+            # Files that fit in one chunk load silently
+            if progress is not None and rows_read > len(chunk):
+                progress(rows_read, total_bytes, total_bytes)
+
+
+class DatasetAccumulator:
+    """Incrementally merged disease -> symptom state"""
+
+    def __init__(self):
+        # disease -> {symptom: number of the disease's rows listing it}, in first-seen order
+        self.symptom_counts = {}
+        # disease -> number of rows
+        self.case_counts = {}
+        self.all_symptoms = set()
+        # Symptom lists of diseases seen in exactly one row, kept verbatim
+        self._single_rows = {}
+
+    def add(self, disease, symptoms):
+        self.add_rows([(disease, symptoms)])
+
+    def add_rows(self, rows):
+        symptom_counts = self.symptom_counts
+        case_counts = self.case_counts
+        single_rows = self._single_rows
+        all_symptoms = self.all_symptoms
+        for disease, symptoms in rows:
+            counts = symptom_counts.get(disease)
+            if counts is None:
+                counts = symptom_counts[disease] = {}
+                case_counts[disease] = 1
+                single_rows[disease] = symptoms
+            else:
+                case_counts[disease] += 1
+                single_rows.pop(disease, None)
+            for symptom in dict.fromkeys(symptoms):
+                counts[symptom] = counts.get(symptom, 0) + 1
+            all_symptoms.update(symptoms)
+
+    @property
+    def rows(self):
+        return sum(self.case_counts.values())
+
+    def disease_symptom_map(self):
+        """Disease -> symptoms; a disease's rows are merged without duplicates"""
+        return {
+            disease: self._single_rows.get(disease) or list(counts)
+            for disease, counts in self.symptom_counts.items()
+        }
+
+    def result(self):
+        """(disease_symptom_map, all_symptoms) as returned by parse_dataset_csv"""
+        return self.disease_symptom_map(), sorted(self.all_symptoms)
+
+
+class ProgressReporter:
+    """Progress callback printing to stderr at most once per interval seconds"""
+
+    def __init__(self, interval=1.0, clock=time.monotonic):
+        self.interval = interval
+        self._clock = clock
+        self._last = clock()
+
+    def __call__(self, rows_read, consumed, total_bytes):
+        now = self._clock()
+        if consumed < total_bytes and now - self._last < self.interval:
+            return
+        self._last = now
+        percent = 100.0 * consumed / total_bytes if total_bytes else 100.0
+        print(f"Ingested {rows_read} dataset rows ({percent:.0f}%)", file=sys.stderr)
+
+
+def stream_dataset_csv(dataset_path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Fold a dataset.csv file into a DatasetAccumulator chunk by chunk"""
+    accumulator = DatasetAccumulator()
+    for chunk in iter_dataset_chunks(dataset_path, chunk_size, progress):
+        accumulator.add_rows(chunk)
+    return accumulator
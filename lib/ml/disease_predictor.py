@@ -1,7 +1,28 @@
 import json
 import sys
 import os
+import contextvars
+import copy
 import csv
+import functools
+import hashlib
+import heapq
+import importlib.util
+import itertools
+import multiprocessing
+import pickle
+import socketserver
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+from dataset_stream import DEFAULT_CHUNK_SIZE, ProgressReporter, stream_dataset_csv
+from kb_snapshot import KnowledgeBaseSnapshot, build_snapshot, file_sha256, is_source_fresh, source_stamp
+from response_encoding import BATCH_FORMATS, EnrichmentTable
+from result_cache import ResultCache
+from symptom_catalog import SymptomCatalog, iter_bits, popcount
+from symptom_search import SymptomSearchIndex
 
 # Sample symptoms for fallback (only used if CSV files can't be read)
 FALLBACK_SYMPTOMS = [
@@ -45,6 +66,25 @@ FALLBACK_PRECAUTIONS = {
     "Gastroenteritis": ["stay hydrated", "rest", "avoid dairy products", "gradually reintroduce food"]
 }
 
+# Hyperparameters of the RandomForest model. Changing them invalidates cached model artifacts.
+MODEL_PARAMS = {"n_estimators": 100, "random_state": 42}
+
+# Worker count for tree fitting and the process-pool batch path; -1 uses every core.
+# Forests fitted with any n_jobs are identical, so it is not part of MODEL_PARAMS.
+N_JOBS = int(os.environ.get('MEDIMIND_N_JOBS') or -1)
+
+# Layout of model artifacts; bump it when their contents change so stale ones are rebuilt
+MODEL_ARTIFACT_FORMAT = 4
+
+# Trees of the forest refitted by each update(); the oldest trees are replaced first
+FOREST_UPDATE_TREES = 10
+
+# Most distinct training rows the trees of an update() are fitted on, split evenly between diseases
+FOREST_UPDATE_SAMPLE = 2048
+
+# Parameters of the NumPy Naive Bayes engine, keyed like MODEL_PARAMS
+NAIVE_BAYES_PARAMS = {"engine": "naive_bayes", "alpha": 1.0}
+
 # Critical symptom-disease pairs (symptoms that strongly indicate specific diseases)
 CRITICAL_SYMPTOM_DISEASE_PAIRS = {
     "patches_in_throat": ["AIDS"],
@@ -107,26 +147,62 @@ CRITICAL_SYMPTOM_DISEASE_PAIRS = {
     "swollen_blood_vessels": ["Varicose veins"]
 }
 
-try:
-    # Try to import pandas and other libraries
-    import pandas as pd
-    import numpy as np
-    from sklearn.ensemble import RandomForestClassifier
-    
-    USING_ML = True
-    print("Using machine learning model with pandas/sklearn", file=sys.stderr)
-except ImportError:
-    # Fall back to basic pattern matching
-    USING_ML = False
-    print("Pandas/sklearn not available. Using fallback pattern matching.", file=sys.stderr)
+# Heavy libraries are imported on first use (see numpy_available and fit_forest)
+# so that commands which do not need them start quickly.
+np = None
+USING_NUMPY = None
+USING_ML = None
+
+
+def numpy_available():
+    """Import NumPy on first use; False if it is not installed"""
+    global np, USING_NUMPY
+    if USING_NUMPY is None:
+        try:
+            # NumPy alone is enough for the array-based rule engine
+            import numpy
+            np = numpy
+            USING_NUMPY = True
+        except ImportError:
+            USING_NUMPY = False
+    return USING_NUMPY
+
+
+def sklearn_available():
+    """Whether scikit-learn is installed, checked without importing it; only fitting the forest needs it"""
+    return importlib.util.find_spec('sklearn') is not None
+
+
+def ml_available():
+    """Whether the RandomForest engine can be used, decided on first use.
+
+    The model is served from a FlatForest artifact, which only needs NumPy.
+    Without scikit-learn the forest cannot be fitted, so then it is only
+    used if an artifact for the current training data is already cached.
+    """
+    global USING_ML
+    if USING_ML is None:
+        USING_ML = numpy_available() and (sklearn_available() or _model_artifact_cached())
+        if USING_ML:
+            print("Using machine learning model", file=sys.stderr)
+        else:
+            print("No trained model and scikit-learn not available. Using fallback engines.", file=sys.stderr)
+    return USING_ML
 
 
 def get_dataset_path(filename):
+    # MEDIMIND_DATA_DIR points every dataset file at one directory (used for benchmarks)
+    data_dir = os.environ.get('MEDIMIND_DATA_DIR')
+    if data_dir:
+        return os.path.join(data_dir, filename)
     current_dir = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(current_dir, '../../public/data', filename)
 
 
 def get_dataset_path_backend(filename):
+    data_dir = os.environ.get('MEDIMIND_DATA_DIR')
+    if data_dir:
+        return os.path.join(data_dir, filename)
     current_dir = os.path.dirname(os.path.abspath(__file__))
     backend_path = os.path.join(current_dir, '../../backend/dataset', filename)
     if os.path.exists(backend_path):
@@ -134,6 +210,15 @@ def get_dataset_path_backend(filename):
     return os.path.join(current_dir, '../../public/data', filename)
 
 
+def get_cache_dir():
+    """Directory holding generated artifacts (trained models, compiled training data, knowledge base snapshot)"""
+    cache_dir = os.environ.get('MEDIMIND_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(current_dir, '.cache')
+
+
 def parse_csv_file(filename, fallback=None):
     """Generic function to parse CSV files with error handling"""
     try:
@@ -251,147 +336,1373 @@ def parse_symptom_severity():
         return {}
 
 
-def parse_dataset_csv():
+def parse_dataset_csv(chunk_size=DEFAULT_CHUNK_SIZE):
     """Parse the dataset.csv file to extract disease-symptom mappings"""
-    disease_symptom_map = {}
-    all_symptoms = set()
-    
     try:
         dataset_path = get_dataset_path_backend('dataset.csv')
         
         if not os.path.exists(dataset_path):
             print(f"Dataset file not found at {dataset_path}", file=sys.stderr)
             return FALLBACK_DISEASE_MAP, FALLBACK_SYMPTOMS
-            
-        with open(dataset_path, 'r') as f:
-            csv_reader = csv.reader(f)
-            # Skip header
-            next(csv_reader)
-            
-            for row in csv_reader:
-                if not row:
-                    continue
-                    
-                disease = row[0].strip()
-                symptoms = []
-                
-                # Process symptoms (start from index 1)
-                for i in range(1, len(row)):
-                    # Skip empty or 'null' values
-                    if row[i] and row[i].strip().lower() != 'null':
-                        symptom = row[i].strip()
-                        symptoms.append(symptom)
-                        all_symptoms.add(symptom)
-                
-                # Add or update disease-symptom mapping
-                if disease in disease_symptom_map:
-                    # Merge symptoms for the same disease (avoid duplicates)
-                    existing_symptoms = set(disease_symptom_map[disease])
-                    existing_symptoms.update(symptoms)
-                    disease_symptom_map[disease] = list(existing_symptoms)
-                else:
-                    disease_symptom_map[disease] = symptoms
+        
+        # Rows are streamed in chunks and merged per disease as they arrive
+        accumulator = stream_dataset_csv(dataset_path, chunk_size, progress=ProgressReporter())
+        disease_symptom_map, all_symptoms = accumulator.result()
         
         print(f"Successfully parsed dataset.csv with {len(disease_symptom_map)} diseases and {len(all_symptoms)} unique symptoms", file=sys.stderr)
-        return disease_symptom_map, sorted(list(all_symptoms))
+        return disease_symptom_map, all_symptoms
     except Exception as e:
         print(f"Error parsing dataset.csv: {str(e)}", file=sys.stderr)
         return FALLBACK_DISEASE_MAP, FALLBACK_SYMPTOMS
 
 
-# Load all data when module is imported
-DISEASE_SYMPTOM_MAP, ALL_SYMPTOMS = parse_dataset_csv()
-DISEASE_DESCRIPTIONS = parse_disease_description()
-DISEASE_PRECAUTIONS = parse_disease_precautions()
-SYMPTOM_SEVERITY = parse_symptom_severity()
+# Source CSV of each knowledge base table
+KB_SOURCES = {
+    'dataset': 'dataset.csv',
+    'descriptions': 'disease_description.csv',
+    'precautions': 'disease_precaution.csv',
+    'severity': 'symptom_severity.csv'
+}
+
+# Tables and indexes derived from each source file, rebuilt when it changes.
+# 'training' is Training.csv, whose header contributes to the vocabulary.
+KB_DEPENDENTS = {
+    'dataset': ('dataset', 'vocabulary', 'symptom_ids', 'catalog', 'clinical_engine', 'symptom_search'),
+    'descriptions': ('descriptions', 'enrichment'),
+    'precautions': ('precautions', 'enrichment'),
+    'severity': ('severity', 'catalog', 'clinical_engine'),
+    'training': ('vocabulary', 'symptom_ids', 'catalog', 'clinical_engine', 'symptom_search'),
+}
+
+
+def kb_source_path(name):
+    if name == 'training':
+        return get_dataset_path('Training.csv')
+    return get_dataset_path_backend(KB_SOURCES[name])
+
+
+def get_snapshot_path():
+    return os.path.join(get_cache_dir(), 'kb-snapshot.bin')
+
+
+def build_kb_snapshot(snapshot_path=None):
+    """Compile the knowledge base CSVs into a snapshot file and return its path"""
+    snapshot_path = snapshot_path or get_snapshot_path()
+    disease_symptom_map, all_symptoms = parse_dataset_csv()
+    build_snapshot(
+        snapshot_path,
+        disease_symptom_map,
+        all_symptoms,
+        parse_disease_description(),
+        parse_disease_precautions(),
+        parse_symptom_severity(),
+        {name: get_dataset_path_backend(filename) for name, filename in KB_SOURCES.items()}
+    )
+    return snapshot_path
+
+
+SymptomVocabulary = namedtuple('SymptomVocabulary', ['version', 'symptoms'])
+
+# Each KnowledgeBase instance gets a new version, which is part of result cache keys
+_KB_VERSIONS = itertools.count(1)
+
+
+class KnowledgeBase:
+    """Disease knowledge tables and the indexes derived from them.
+
+    Each table is loaded on first access, so commands that only need part of
+    the data (or none of it) do not pay for the rest. Tables come from the
+    compiled snapshot (see build_kb_snapshot) when its copy of the source CSV
+    is current, and are parsed from the CSV otherwise.
+
+    A KnowledgeBase never changes once a table is loaded; the stamp of every
+    source file read is kept so reload_knowledge_base can tell which tables
+    went stale and build a new version around the rest.
+    """
+
+    def __init__(self, snapshot_path=None):
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._stamps = {}
+        self._snapshot_path = snapshot_path
+        self.version = next(_KB_VERSIONS)
+
+    def _snapshot(self):
+        def open_snapshot():
+            snapshot_path = self._snapshot_path or get_snapshot_path()
+            if not os.path.exists(snapshot_path):
+                return False
+            try:
+                snapshot = KnowledgeBaseSnapshot(snapshot_path)
+                print(f"Using knowledge base snapshot {snapshot_path}", file=sys.stderr)
+                return snapshot
+            except (OSError, ValueError) as e:
+                print(f"Ignoring knowledge base snapshot: {str(e)}", file=sys.stderr)
+                return False
+
+        return self._lazy('snapshot', open_snapshot) or None
+
+    def _load(self, name, parse):
+        """Load a table from the snapshot if it is current, else from its CSV"""
+        snapshot = self._snapshot()
+        if snapshot is not None and snapshot.is_fresh(name, kb_source_path(name)):
+            self._stamps[name] = snapshot.sources[name]
+            with instrumentation.timer(f'load.{name}.snapshot'):
+                return getattr(snapshot, name)()
+        # Stamp before parsing, so an edit made while parsing is seen as a change
+        self._stamps[name] = source_stamp(kb_source_path(name))
+        with instrumentation.timer(f'load.{name}.csv'):
+            return parse()
+
+    def _lazy(self, name, build):
+        table = self._tables.get(name)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = build()
+                    self._tables[name] = table
+        return table
+
+    def _dataset(self):
+        # Cases labeled through update() extend the disease -> symptom map
+        return self._lazy('dataset', lambda: merge_labeled_cases(
+            self._load('dataset', parse_dataset_csv), labeled_cases()
+        ))
+
+    @property
+    def disease_symptom_map(self):
+        return self._dataset()[0]
+
+    @property
+    def all_symptoms(self):
+        return self._dataset()[1]
+
+    @property
+    def descriptions(self):
+        return self._lazy('descriptions', lambda: self._load('descriptions', parse_disease_description))
+
+    @property
+    def precautions(self):
+        return self._lazy('precautions', lambda: self._load('precautions', parse_disease_precautions))
+
+    @property
+    def severity(self):
+        return self._lazy('severity', lambda: self._load('severity', parse_symptom_severity))
+
+    @property
+    def vocabulary(self):
+        def build():
+            self._stamps['training'] = source_stamp(kb_source_path('training'))
+            # Training.csv is one-hot encoded, so its header row names the model's symptoms
+            symptoms = tuple(sorted(set(read_training_symptoms()) | set(self.all_symptoms)))
+            version = hashlib.sha256('\n'.join(symptoms).encode('utf-8')).hexdigest()[:16]
+            return SymptomVocabulary(version, symptoms)
+
+        return self._lazy('vocabulary', build)
+
+    @property
+    def symptom_ids(self):
+        """Dense integer id of every vocabulary symptom"""
+        return self._lazy('symptom_ids', lambda: {
+            symptom: symptom_id for symptom_id, symptom in enumerate(self.vocabulary.symptoms)
+        })
+
+    @property
+    def catalog(self):
+        """Diseases and symptoms coded as vocabulary ids and bitsets (see SymptomCatalog)"""
+        return self._lazy('catalog', lambda: SymptomCatalog(
+            self.disease_symptom_map, self.severity, self.symptom_ids, CRITICAL_SYMPTOM_DISEASE_PAIRS
+        ))
+
+    @property
+    def symptom_index(self):
+        # The catalog took over the symptom -> disease index this name used to hold
+        return self.catalog
+
+    @property
+    def symptom_search(self):
+        """Autocomplete and fuzzy resolution over the vocabulary"""
+        return self._lazy('symptom_search', lambda: SymptomSearchIndex(self.vocabulary.symptoms))
+
+    @property
+    def clinical_engine(self):
+        return self._lazy('clinical_engine', lambda: ClinicalRelevanceEngine(
+            self.catalog, CRITICAL_SYMPTOM_DISEASE_PAIRS
+        ))
+
+    @property
+    def enrichment(self):
+        """Descriptions and precautions pre-rendered as JSON fragments (see EnrichmentTable)"""
+        return self._lazy('enrichment', lambda: EnrichmentTable(self.descriptions, self.precautions))
+
+    def load_all(self):
+        """Load every table and index now instead of on first use"""
+        self.disease_symptom_map
+        self.descriptions
+        self.precautions
+        self.enrichment
+        self.severity
+        self.vocabulary
+        self.catalog
+        self.symptom_search
+        if numpy_available():
+            self.clinical_engine
+
+    def changed_sources(self):
+        """Sources of loaded tables whose files no longer match what was loaded"""
+        changed = []
+        for name, stamp in list(self._stamps.items()):
+            source_path = kb_source_path(name)
+            if not is_source_fresh(stamp, source_path):
+                changed.append(name)
+            elif stamp is not None and os.stat(source_path).st_mtime_ns != stamp["mtime_ns"]:
+                # Touched but unchanged: remember the new mtime to skip hashing next time
+                self._stamps[name] = dict(stamp, mtime_ns=os.stat(source_path).st_mtime_ns)
+        return changed
+
+    def reloaded(self, changed):
+        """A new version sharing every table and index not derived from the changed sources"""
+        stale = {table for name in changed for table in KB_DEPENDENTS[name]}
+        kb = KnowledgeBase(self._snapshot_path)
+        with self._lock:
+            kb._tables = {name: table for name, table in self._tables.items() if name not in stale}
+            kb._stamps = {name: stamp for name, stamp in self._stamps.items() if name not in changed}
+        return kb
+
+    def with_labeled_cases(self, cases):
+        """A new version with cases merged into the disease -> symptom map and the indexes derived from it"""
+        kb = KnowledgeBase(self._snapshot_path)
+        with self._lock:
+            kb._tables = {name: table for name, table in self._tables.items() if name not in KB_DEPENDENTS['dataset']}
+            kb._stamps = dict(self._stamps)
+            if 'dataset' in self._tables:
+                kb._tables['dataset'] = merge_labeled_cases(self._tables['dataset'], cases)
+        return kb
+
+
+# The live version, swapped by reload_knowledge_base
+_LIVE_KB = KnowledgeBase()
+_PINNED_KB = contextvars.ContextVar('pinned_kb', default=None)
+_RELOAD_LOCK = threading.Lock()
+
+
+def current_knowledge_base():
+    """The version pinned by the running request, else the live one"""
+    return _PINNED_KB.get() or _LIVE_KB
+
+
+class pinned_knowledge_base:
+    """Keep the enclosed block on one knowledge base version even if a reload swaps it"""
+
+    def __enter__(self):
+        self.kb = current_knowledge_base()
+        self._token = _PINNED_KB.set(self.kb)
+        return self.kb
+
+    def __exit__(self, *exc):
+        _PINNED_KB.reset(self._token)
+        return False
+
+
+class _KnowledgeBaseProxy:
+    """Module-wide KB: forwards to current_knowledge_base()"""
+
+    def __getattr__(self, name):
+        return getattr(current_knowledge_base(), name)
+
+
+KB = _KnowledgeBaseProxy()
+
+
+def reload_knowledge_base():
+    """Swap in a new knowledge base version if any loaded source file changed.
+
+    Only the tables and indexes derived from the changed files are rebuilt,
+    and they are built before the swap, so requests never wait on a reload.
+    Requests already running finish on the version they pinned. Returns the
+    names of the changed sources (empty if nothing changed).
+    """
+    global _LIVE_KB
+    with _RELOAD_LOCK:
+        changed = _LIVE_KB.changed_sources()
+        if not changed:
+            return []
+        with instrumentation.timer('load.reload'):
+            kb = _LIVE_KB.reloaded(changed)
+            kb.load_all()
+        _LIVE_KB = kb
+    instrumentation.count('load.reloads')
+    print(f"Reloaded knowledge base version {kb.version} after changes to {', '.join(changed)}", file=sys.stderr)
+    return changed
+
+
+class KnowledgeBaseWatcher(threading.Thread):
+    """Daemon thread polling the source files every interval seconds and reloading on change"""
+
+    def __init__(self, interval=2.0):
+        super().__init__(name='kb-watcher', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                reload_knowledge_base()
+            except Exception as e:
+                print(f"Error reloading knowledge base: {str(e)}", file=sys.stderr)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def labeled_cases_path():
+    """JSON lines log of the cases added through update(), replayed on every load"""
+    return os.environ.get('MEDIMIND_LABELED_CASES') or get_dataset_path_backend('labeled_cases.jsonl')
+
+
+# Cases from the labeled case log, read on first use and appended to by update()
+_LABELED_CASES = None
+_LABELED_CASES_LOCK = threading.Lock()
+
+
+def labeled_case(case):
+    """Validate one labeled case, given as {"symptoms": [...], "disease": "..."} or a (symptoms, disease) pair"""
+    if isinstance(case, dict):
+        symptoms, disease = case.get('symptoms'), case.get('disease')
+    elif isinstance(case, (list, tuple)) and len(case) == 2:
+        symptoms, disease = case
+    else:
+        raise ValueError("Labeled cases must have symptoms and a disease")
+    if not isinstance(disease, str) or not disease.strip():
+        raise ValueError("Labeled case has no disease")
+    if not isinstance(symptoms, list) or not all(isinstance(symptom, str) for symptom in symptoms):
+        raise ValueError("Invalid symptoms format")
+    return disease.strip(), list(dict.fromkeys(symptom.strip() for symptom in symptoms if symptom.strip()))
+
+
+def labeled_cases():
+    """Every labeled case as (disease, symptoms), oldest first"""
+    global _LABELED_CASES
+    with _LABELED_CASES_LOCK:
+        if _LABELED_CASES is None:
+            cases = []
+            log_path = labeled_cases_path()
+            if os.path.exists(log_path):
+                with open(log_path, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            cases.append(labeled_case(json.loads(line)))
+            _LABELED_CASES = cases
+        return _LABELED_CASES
+
+
+def append_labeled_cases(cases):
+    """Add validated cases to the log and to labeled_cases()"""
+    global _LABELED_CASES
+    existing = labeled_cases()
+    with _LABELED_CASES_LOCK:
+        with open(labeled_cases_path(), 'a') as f:
+            for disease, symptoms in cases:
+                f.write(json.dumps({"disease": disease, "symptoms": symptoms}) + "\n")
+        # A new list, so callers iterating the old one are not affected
+        _LABELED_CASES = existing + list(cases)
+
+
+def labeled_cases_digest():
+    """Content hash of the labeled case log, None if there is none"""
+    log_path = labeled_cases_path()
+    return file_sha256(log_path) if os.path.exists(log_path) else None
+
+
+def merge_labeled_cases(dataset, cases):
+    """(disease_symptom_map, all_symptoms) with the cases' symptoms added to their diseases.
+
+    New symptoms are appended to a disease's list and new diseases to the
+    map; the input table is left untouched.
+    """
+    disease_symptom_map, all_symptoms = dataset
+    if not cases:
+        return dataset
+    merged = dict(disease_symptom_map)
+    symptoms_seen = set(all_symptoms)
+    for disease, symptoms in cases:
+        current = merged.get(disease, [])
+        known = set(current)
+        added = [symptom for symptom in symptoms if symptom not in known]
+        if added or disease not in merged:
+            merged[disease] = list(current) + added
+        symptoms_seen.update(symptoms)
+    return merged, sorted(symptoms_seen)
+
+
+FALLBACK_CATALOG = SymptomCatalog(FALLBACK_DISEASE_MAP)
+
+# Module-level names the tables were exposed under before they became lazy
+_KB_ATTRIBUTES = {
+    'DISEASE_SYMPTOM_MAP': 'disease_symptom_map',
+    'ALL_SYMPTOMS': 'all_symptoms',
+    'DISEASE_DESCRIPTIONS': 'descriptions',
+    'DISEASE_PRECAUTIONS': 'precautions',
+    'SYMPTOM_SEVERITY': 'severity',
+    'SYMPTOM_DISEASE_INDEX': 'symptom_index'
+}
+
+
+def __getattr__(name):
+    if name in _KB_ATTRIBUTES:
+        return getattr(KB, _KB_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def candidates(input_symptoms):
+    """Names of the diseases that share at least one symptom with the input"""
+    return [disease for disease, _ in KB.catalog.candidates(input_symptoms)]
+
+
+def read_training_symptoms(training_path=None):
+    """Symptom names from the header row of the one-hot Training.csv"""
+    training_path = training_path or get_dataset_path('Training.csv')
+    try:
+        with open(training_path, 'r') as f:
+            header = next(csv.reader(f), [])
+        return [column.strip() for column in header if column.strip() and column.strip() != 'prognosis']
+    except Exception as e:
+        print(f"Error reading symptoms from Training.csv: {str(e)}", file=sys.stderr)
+        return []
+
+
+def get_symptom_vocabulary():
+    """Sorted symptom vocabulary with a version string (usable as an ETag)"""
+    return KB.vocabulary
 
 
 def get_all_symptoms():
     """Get list of all symptoms"""
-    if USING_ML:
+    return list(KB.vocabulary.symptoms)
+
+
+def complete_symptoms(prefix, limit=10):
+    """Vocabulary symptoms matching a partially typed name, best first"""
+    return KB.symptom_search.complete(prefix, limit)
+
+
+def resolve_symptoms(input_symptoms):
+    """Map free-form symptom names onto the vocabulary.
+
+    Returns (symptoms, matches, unresolved): the resolved vocabulary keys
+    without duplicates, one match dict (see SymptomSearchIndex.resolve) per
+    resolved input, and the inputs nothing matched.
+    """
+    search = KB.symptom_search
+    symptoms = []
+    matches = []
+    unresolved = []
+    for text in input_symptoms:
+        match = search.resolve(text) if isinstance(text, str) else None
+        if match is None:
+            unresolved.append(text)
+            continue
+        matches.append(dict(match, input=text))
+        if match["symptom"] not in symptoms:
+            symptoms.append(match["symptom"])
+    return symptoms, matches, unresolved
+
+
+# In-process copy of the model artifact, with the stat of the training file it was built from
+_MODEL_ARTIFACT = None
+_MODEL_SOURCE_STAT = None
+_MODEL_LOCK = threading.Lock()
+
+
+def model_cache_key(training_path, params=None):
+    """Cache key derived from the training data (Training.csv and labeled cases) and the model hyperparameters"""
+    params = MODEL_PARAMS if params is None else params
+    payload = json.dumps({
+        "training_sha256": file_sha256(training_path),
+        "labeled_cases_sha256": labeled_cases_digest(),
+        "params": params,
+        "format": MODEL_ARTIFACT_FORMAT
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _model_artifact_path(key, kind='model'):
+    return os.path.join(get_cache_dir(), f'{kind}-{key}.pkl')
+
+
+def _model_artifact_cached():
+    try:
+        return os.path.exists(_model_artifact_path(model_cache_key(get_dataset_path('Training.csv'))))
+    except OSError:
+        return False
+
+
+def _read_model_artifact(artifact_path, key):
+    """Load a model artifact from disk, returning None if it is missing or unusable"""
+    if not os.path.exists(artifact_path):
+        return None
+    try:
+        with open(artifact_path, 'rb') as f:
+            artifact = pickle.load(f)
+        if artifact.get('key') != key:
+            return None
+        return artifact
+    except Exception as e:
+        print(f"Ignoring unreadable model artifact {artifact_path}: {str(e)}", file=sys.stderr)
+        return None
+
+
+def _write_model_artifact(artifact_path, artifact):
+    """Atomically write a model artifact and remove artifacts of the same kind with older keys"""
+    cache_dir = os.path.dirname(artifact_path)
+    kind = os.path.basename(artifact_path).rsplit('-', 1)[0]
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, artifact_path)
+
+    for name in os.listdir(cache_dir):
+        if name.startswith(f'{kind}-') and name.endswith('.pkl') and os.path.join(cache_dir, name) != artifact_path:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def fit_forest(X_train, y_train, weights, params=None, n_jobs=None):
+    """Fit a RandomForestClassifier on deduplicated rows as if each occurred weight times.
+
+    Without repeated rows the weights are left out, so the forest is the one
+    a plain fit on the CSV gives. Otherwise every tree bootstraps as many
+    rows as the data had, drawn in proportion to the weights, which is how
+    it would sample the repeated rows.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    params = MODEL_PARAMS if params is None else params
+    n_jobs = N_JOBS if n_jobs is None else n_jobs
+    if weights is None or (weights == 1).all():
+        model = RandomForestClassifier(**params, n_jobs=n_jobs)
+        model.fit(X_train, y_train)
+        return model
+    try:
+        model = RandomForestClassifier(**params, max_samples=int(weights.sum()), n_jobs=n_jobs)
+        model.fit(X_train, y_train, sample_weight=weights)
+    except ValueError:
+        # scikit-learn before 1.9 caps max_samples at the row count and scales bootstrap counts by the weights
+        model = RandomForestClassifier(**params, n_jobs=n_jobs)
+        model.fit(X_train, y_train, sample_weight=weights)
+    return model
+
+
+def train_model(force=False):
+    """Train the RandomForest model and store it as an artifact.
+
+    The artifact holds the forest exported to a FlatForest rather than the
+    sklearn estimator. Unless force is set, an existing artifact for the
+    current training data and hyperparameters is reused instead of fitting
+    again.
+    """
+    global _MODEL_ARTIFACT, _MODEL_SOURCE_STAT, _UPDATES_SINCE_COMPACTION
+    from flat_forest import FlatForest
+
+    training_path = get_dataset_path('Training.csv')
+    source_stat = os.stat(training_path)
+    key = model_cache_key(training_path)
+    artifact_path = _model_artifact_path(key)
+
+    artifact = None
+    if not force:
+        with instrumentation.timer('model.load_artifact'):
+            artifact = _read_model_artifact(artifact_path, key)
+        if artifact is not None and artifact.get('pending_cases'):
+            # Saved by update(): it still has to be compacted
+            _UPDATES_SINCE_COMPACTION = max(_UPDATES_SINCE_COMPACTION, artifact['pending_cases'])
+    if artifact is None:
+        with instrumentation.timer('model.load_training_data'):
+            columns, X_train, y_train, weights = training_set()
+
+        with instrumentation.timer('model.fit'):
+            model = fit_forest(X_train, y_train, weights)
+        instrumentation.count('model.trained')
+
+        artifact = {
+            'key': key,
+            'params': dict(MODEL_PARAMS),
+            'columns': columns,
+            'classes': list(model.classes_),
+            'model': FlatForest.from_sklearn(model)
+        }
         try:
-            df = pd.read_csv(get_dataset_path('Training.csv'))
-            
-            # Get all symptom columns (excluding prognosis/disease column)
-            symptom_cols = df.columns[:-1]
-            
-            # Get unique symptoms that are not empty
-            all_symptoms = set()
-            for col in symptom_cols:
-                symptoms = df[col].dropna().unique()
-                symptoms = [s for s in symptoms if s != '']
-                all_symptoms.update(symptoms)
-            
-            # Add symptoms from dataset.csv
-            all_symptoms.update(ALL_SYMPTOMS)
-            
-            # Convert to sorted list
-            return sorted(list(all_symptoms))
-        except Exception as e:
-            print(f"Error getting symptoms from Training.csv: {str(e)}", file=sys.stderr)
-            # Fall back to symptoms from dataset.csv
-            return ALL_SYMPTOMS
-    else:
-        # Use symptoms from dataset.csv
-        return ALL_SYMPTOMS
+            with instrumentation.timer('model.save_artifact'):
+                _write_model_artifact(artifact_path, artifact)
+            print(f"Saved model artifact to {artifact_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Could not save model artifact: {str(e)}", file=sys.stderr)
 
+    # Symptom -> column lookup used to encode inputs
+    artifact['column_index'] = {column: idx for idx, column in enumerate(artifact['columns'])}
 
-def predict(input_symptoms):
-    """Predict disease based on symptoms"""
-    if USING_ML:
+    _MODEL_ARTIFACT = artifact
+    _MODEL_SOURCE_STAT = (source_stat.st_mtime_ns, source_stat.st_size)
+    return artifact
+
+
+def load_model():
+    """Get the model artifact, training it only if no valid cached artifact exists"""
+    training_path = get_dataset_path('Training.csv')
+    with _MODEL_LOCK:
+        if _MODEL_ARTIFACT is not None:
+            source_stat = os.stat(training_path)
+            if (source_stat.st_mtime_ns, source_stat.st_size) == _MODEL_SOURCE_STAT:
+                return _MODEL_ARTIFACT
+        return train_model()
+
+
+# In-process copy of the Naive Bayes artifact, cached like _MODEL_ARTIFACT
+_NAIVE_BAYES_ARTIFACT = None
+_NAIVE_BAYES_SOURCE_STAT = None
+_NAIVE_BAYES_LOCK = threading.Lock()
+
+
+def get_training_data_path(csv_path):
+    """Cache location of the compiled form of a one-hot CSV (see training_data)"""
+    name = os.path.splitext(os.path.basename(csv_path))[0].lower()
+    return os.path.join(get_cache_dir(), f'{name}-data.bin')
+
+
+def load_training_data(csv_path=None, rebuild=False):
+    """Deduplicated, bit-packed rows of a one-hot CSV (Training.csv by default).
+
+    The compiled copy in the cache directory is used while it matches the
+    CSV; otherwise the CSV is parsed, deduplicated and compiled again.
+    """
+    if not numpy_available():
+        raise RuntimeError("NumPy is not available")
+    from training_data import TrainingData
+
+    csv_path = csv_path or get_dataset_path('Training.csv')
+    data_path = get_training_data_path(csv_path)
+    if not rebuild and os.path.exists(data_path):
         try:
-            # Load datasets
-            train_df = pd.read_csv(get_dataset_path('Training.csv'))
-            test_df = pd.read_csv(get_dataset_path('Testing.csv'))
-            
-            # Prepare X and y for training
-            X_train = train_df.drop('prognosis', axis=1)
-            y_train = train_df['prognosis']
-            
-            # Train the model
-            model = RandomForestClassifier(n_estimators=100, random_state=42)
-            model.fit(X_train, y_train)
-            
-            # Create vector for input symptoms
-            input_vector = np.zeros(len(X_train.columns))
-            for symptom in input_symptoms:
-                if symptom in X_train.columns:
-                    idx = X_train.columns.get_loc(symptom)
-                    input_vector[idx] = 1
-            
-            # Predict disease
-            disease = model.predict([input_vector])[0]
-            
-            # Get prediction probabilities and confidence
-            probabilities = model.predict_proba([input_vector])[0]
-            disease_idx = list(model.classes_).index(disease)
-            confidence = probabilities[disease_idx] * 100
-            
-            result = {
-                'disease': disease,
-                'confidence': float(confidence)
-            }
-            
-            # Add description if available
-            if disease in DISEASE_DESCRIPTIONS:
-                result['description'] = DISEASE_DESCRIPTIONS[disease]
-            
-            # Add precautions if available
-            if disease in DISEASE_PRECAUTIONS:
-                result['precautions'] = DISEASE_PRECAUTIONS[disease]
-            
-            return result
+            with instrumentation.timer('training_data.load'):
+                data = TrainingData.load(data_path)
+            if data.is_fresh(csv_path):
+                return data
+        except (OSError, ValueError) as e:
+            print(f"Ignoring compiled training data {data_path}: {str(e)}", file=sys.stderr)
+
+    with instrumentation.timer('training_data.compile'):
+        data = TrainingData.from_csv(csv_path)
+    try:
+        data.save(data_path)
+        print(f"Compiled {data.n_rows} rows ({data.n_patterns} unique) of {csv_path} to {data_path}", file=sys.stderr)
+    except OSError as e:
+        print(f"Could not save compiled training data: {str(e)}", file=sys.stderr)
+    return data
+
+
+def labeled_case_matrix(cases, columns):
+    """One-hot rows and labels of labeled cases over the model columns; other symptoms are ignored"""
+    column_index = {column: idx for idx, column in enumerate(columns)}
+    return encode_symptoms([symptoms for _, symptoms in cases], column_index), [disease for disease, _ in cases]
+
+
+def training_set():
+    """(columns, X, y, sample_weight) of Training.csv and every labeled case.
+
+    Identical rows are collapsed into one, weighted by how often they occur.
+    """
+    data = load_training_data()
+    cases = labeled_cases()
+    if cases:
+        data = data.with_rows(*labeled_case_matrix(cases, data.columns))
+    return data.columns, data.matrix(), data.label_names(), data.weights
+
+
+def train_naive_bayes(force=False):
+    """Fit the NumPy Naive Bayes engine and store it as an artifact (see train_model)"""
+    global _NAIVE_BAYES_ARTIFACT, _NAIVE_BAYES_SOURCE_STAT
+    from naive_bayes import BernoulliNaiveBayes
+
+    training_path = get_dataset_path('Training.csv')
+    source_stat = os.stat(training_path)
+    key = model_cache_key(training_path, NAIVE_BAYES_PARAMS)
+    artifact_path = _model_artifact_path(key, 'naive_bayes')
+
+    artifact = None
+    if not force:
+        with instrumentation.timer('naive_bayes.load_artifact'):
+            artifact = _read_model_artifact(artifact_path, key)
+    if artifact is None:
+        columns, X_train, y_train, weights = training_set()
+        model = BernoulliNaiveBayes(alpha=NAIVE_BAYES_PARAMS["alpha"])
+        with instrumentation.timer('naive_bayes.fit'):
+            model.fit(X_train, y_train, sample_weight=weights)
+        instrumentation.count('naive_bayes.trained')
+
+        artifact = {
+            'key': key,
+            'params': dict(NAIVE_BAYES_PARAMS),
+            'columns': columns,
+            'classes': list(model.classes_),
+            'model': model
+        }
+        try:
+            _write_model_artifact(artifact_path, artifact)
+            print(f"Saved Naive Bayes artifact to {artifact_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Could not save Naive Bayes artifact: {str(e)}", file=sys.stderr)
+
+    artifact['column_index'] = {column: idx for idx, column in enumerate(artifact['columns'])}
+
+    _NAIVE_BAYES_ARTIFACT = artifact
+    _NAIVE_BAYES_SOURCE_STAT = (source_stat.st_mtime_ns, source_stat.st_size)
+    return artifact
+
+
+def load_naive_bayes():
+    """Get the Naive Bayes artifact, fitting it only if no valid cached artifact exists"""
+    training_path = get_dataset_path('Training.csv')
+    with _NAIVE_BAYES_LOCK:
+        if _NAIVE_BAYES_ARTIFACT is not None:
+            source_stat = os.stat(training_path)
+            if (source_stat.st_mtime_ns, source_stat.st_size) == _NAIVE_BAYES_SOURCE_STAT:
+                return _NAIVE_BAYES_ARTIFACT
+        return train_naive_bayes()
+
+
+# Serializes update() and compact_models()
+_UPDATE_LOCK = threading.Lock()
+# Labeled cases folded in incrementally since the models were last fitted from scratch
+_UPDATES_SINCE_COMPACTION = 0
+
+
+def _updated_key(key, cases):
+    payload = json.dumps({"base": key, "cases": cases}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _update_naive_bayes(artifact, cases):
+    """A copy of the Naive Bayes artifact with the cases added to its counts (exact)"""
+    model = copy.deepcopy(artifact['model'])
+    X_cases, y_cases = labeled_case_matrix(cases, artifact['columns'])
+    model.partial_fit(X_cases, y_cases)
+    return dict(artifact, key=_updated_key(artifact['key'], cases), classes=list(model.classes_), model=model)
+
+
+def _update_forest(artifact, cases, earlier_cases):
+    """A copy of the forest artifact whose oldest FOREST_UPDATE_TREES trees are refitted.
+
+    The new trees are fitted on a class-stratified sample of at most
+    FOREST_UPDATE_SAMPLE distinct rows of Training.csv and the earlier
+    labeled cases, plus every one of the new cases, so an update costs the
+    same however large the data grows. The rest of the forest keeps its
+    trees. The artifact takes the cache key of the data with the new cases
+    (see model_cache_key) and is saved, so a restart loads it instead of
+    fitting again.
+    """
+    from flat_forest import FlatForest
+
+    forest = artifact['model']
+    n_trees = min(FOREST_UPDATE_TREES, forest.n_trees)
+    updates = artifact.get('updates', 0)
+    random_state = MODEL_PARAMS.get('random_state', 0) + updates + 1
+    with instrumentation.timer('model.update_sample'):
+        data = load_training_data()
+        if earlier_cases:
+            data = data.with_rows(*labeled_case_matrix(earlier_cases, data.columns))
+        data = data.stratified_sample(FOREST_UPDATE_SAMPLE, np.random.default_rng(random_state))
+        data = data.with_rows(*labeled_case_matrix(cases, data.columns))
+    with instrumentation.timer('model.update_fit'):
+        model = fit_forest(data.matrix(), data.label_names(), data.weights,
+                           dict(MODEL_PARAMS, n_estimators=n_trees, random_state=random_state))
+
+    # Replace trees round-robin, oldest first
+    first = (updates * n_trees) % forest.n_trees
+    positions = [(first + offset) % forest.n_trees for offset in range(n_trees)]
+    updated = forest.replace_trees(positions, FlatForest.from_sklearn(model))
+    artifact = dict(artifact, key=model_cache_key(get_dataset_path('Training.csv')), classes=list(updated.classes_),
+                    model=updated, updates=updates + 1, pending_cases=artifact.get('pending_cases', 0) + len(cases))
+    try:
+        _write_model_artifact(_model_artifact_path(artifact['key']),
+                              {name: value for name, value in artifact.items() if name != 'column_index'})
+    except OSError as e:
+        print(f"Could not save updated model artifact: {str(e)}", file=sys.stderr)
+    return artifact
+
+
+def update(cases):
+    """Fold newly labeled cases into the knowledge base and the models without a full retrain.
+
+    cases are {"symptoms": [...], "disease": "..."} dicts or (symptoms,
+    disease) pairs. They are appended to the labeled case log, merged into
+    a new knowledge base version (see KnowledgeBase.with_labeled_cases),
+    added to the Naive Bayes counts, and used to refit FOREST_UPDATE_TREES
+    trees of the forest. Everything is built before it is swapped in, so
+    requests keep being served from the previous versions meanwhile. A full
+    refit happens in compact_models(). Returns a summary of the update.
+    """
+    global _LIVE_KB, _MODEL_ARTIFACT, _NAIVE_BAYES_ARTIFACT, _UPDATES_SINCE_COMPACTION
+    cases = [labeled_case(case) for case in cases]
+    if not cases:
+        return {"cases": 0}
+
+    with _UPDATE_LOCK, instrumentation.timer('model.update'):
+        # Load the models before logging the cases: a model fitted after would already include them
+        forest = None
+        # Refitting trees needs scikit-learn; without it only the other models take the cases
+        if ml_available() and sklearn_available():
+            try:
+                forest = load_model()
+            except Exception as e:
+                print(f"Error loading ML model: {str(e)}", file=sys.stderr)
+        naive_bayes = load_naive_bayes() if numpy_available() else None
+
+        earlier_cases = labeled_cases()
+        append_labeled_cases(cases)
+
+        with _RELOAD_LOCK:
+            kb = _LIVE_KB.with_labeled_cases(cases)
+            kb.load_all()
+            _LIVE_KB = kb
+        if naive_bayes is not None:
+            _NAIVE_BAYES_ARTIFACT = _update_naive_bayes(naive_bayes, cases)
+        if forest is not None:
+            _MODEL_ARTIFACT = _update_forest(forest, cases, earlier_cases)
+        _UPDATES_SINCE_COMPACTION += len(cases)
+    instrumentation.count('model.updated_cases', len(cases))
+
+    print(f"Added {len(cases)} labeled cases (knowledge base version {kb.version})", file=sys.stderr)
+    return {
+        "cases": len(cases),
+        "labeled_cases": len(labeled_cases()),
+        "knowledge_base_version": kb.version,
+        "pending_compaction": _UPDATES_SINCE_COMPACTION
+    }
+
+
+def compact_models():
+    """Refit the models from scratch on Training.csv and every labeled case.
+
+    Replaces the incrementally updated models and stores the refitted ones
+    as artifacts, so a restart loads them instead of fitting again. Returns
+    the number of cases that had been folded in incrementally.
+    """
+    global _UPDATES_SINCE_COMPACTION
+    with _UPDATE_LOCK, instrumentation.timer('model.compact'):
+        pending = _UPDATES_SINCE_COMPACTION
+        # The saved forest artifact already has the current key, so it has to be refitted explicitly
+        if ml_available() and sklearn_available():
+            train_model(force=True)
+        if numpy_available():
+            train_naive_bayes()
+        _UPDATES_SINCE_COMPACTION = 0
+    if pending:
+        print(f"Compacted models after {pending} incrementally added cases", file=sys.stderr)
+    return pending
+
+
+class ModelCompactor(threading.Thread):
+    """Daemon thread refitting the models every interval seconds when update() has added cases"""
+
+    def __init__(self, interval=600.0):
+        super().__init__(name='model-compactor', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            if not _UPDATES_SINCE_COMPACTION:
+                continue
+            try:
+                compact_models()
+            except Exception as e:
+                print(f"Error compacting models: {str(e)}", file=sys.stderr)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def encode_symptom_columns(symptom_lists, column_index):
+    """Encode symptom lists as sets of column indices (one set per list)"""
+    return [{column_index[s] for s in symptoms if s in column_index} for symptoms in symptom_lists]
+
+
+def encode_symptoms(symptom_lists, column_index):
+    """Encode several symptom lists into one one-hot matrix (one row per list)"""
+    rows = []
+    cols = []
+    for row, symptoms in enumerate(symptom_lists):
+        for symptom in symptoms:
+            col = column_index.get(symptom)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    matrix = np.zeros((len(symptom_lists), len(column_index)))
+    matrix[rows, cols] = 1
+    return matrix
+
+
+def add_disease_details(result, disease):
+    """Add description and precautions for disease to result if available"""
+    if disease in KB.descriptions:
+        result['description'] = KB.descriptions[disease]
+
+    if disease in KB.precautions:
+        result['precautions'] = KB.precautions[disease]
+
+    return result
+
+
+def _env_number(name, default, convert):
+    value = os.environ.get(name)
+    return convert(value) if value else default
+
+
+# Memoized results of the prediction engines (size 0 disables it)
+RESULT_CACHE = ResultCache(
+    maxsize=_env_number('MEDIMIND_RESULT_CACHE_SIZE', 1024, int),
+    ttl=_env_number('MEDIMIND_RESULT_CACHE_TTL', None, float)
+)
+
+
+def configure_result_cache(maxsize=None, ttl=None):
+    """Resize the result cache and/or change its TTL in seconds"""
+    RESULT_CACHE.configure(maxsize=maxsize, ttl=ttl)
+
+
+def symptoms_cache_key(input_symptoms):
+    """Cache key of an input: its symptoms in input order, known ones as vocabulary ids.
+
+    Engines report matching symptoms in input order and count repeated
+    inputs, so the key keeps both rather than treating the input as a set.
+    """
+    symptom_ids = KB.symptom_ids
+    return tuple(symptom_ids.get(symptom, symptom) for symptom in input_symptoms)
+
+
+def _model_version():
+    """Key of the model behind predict: the forest, else Naive Bayes, else None"""
+    try:
+        if ml_available():
+            # An updated forest and its compacted refit share a key; the update count tells them apart
+            artifact = load_model()
+            return artifact['key'], artifact.get('updates', 0)
+        return _naive_bayes_version()
+    except Exception:
+        return None
+
+
+def _naive_bayes_version():
+    """Key of the current Naive Bayes artifact, or None without NumPy"""
+    if not numpy_available():
+        return None
+    try:
+        return load_naive_bayes()['key']
+    except Exception:
+        return None
+
+
+def cached_engine(engine, batch=False, model_version=None):
+    """Memoize an engine's results in RESULT_CACHE.
+
+    Engines see the inputs exactly as given, so caching never changes a
+    result. Inputs are keyed (see symptoms_cache_key) together with the
+    engine name, top_k and the knowledge base and model versions (from
+    model_version, for engines backed by a model), so a reload never serves
+    stale answers. Batch engines only compute the rows that miss the cache.
+    """
+    def decorate(func):
+        if batch:
+            compute = func
+        else:
+            def compute(symptom_lists, top_k):
+                return [func(symptoms, top_k) for symptoms in symptom_lists]
+
+        def timed_compute(symptom_lists, top_k):
+            instrumentation.count(f'{engine}.rows', len(symptom_lists))
+            with instrumentation.timer(f'{engine}.compute'):
+                return compute(symptom_lists, top_k)
+
+        def cached_batch(symptom_lists, top_k=None):
+            with pinned_knowledge_base():
+                return lookup_batch(symptom_lists, top_k)
+
+        def lookup_batch(symptom_lists, top_k):
+            symptom_lists = list(symptom_lists)
+            if not RESULT_CACHE.enabled:
+                return timed_compute(symptom_lists, top_k)
+
+            version = (KB.version, model_version() if model_version else None)
+            keys = [(engine, version, top_k, symptoms_cache_key(symptoms)) for symptoms in symptom_lists]
+            results = [None] * len(keys)
+            missing = []
+            for row, key in enumerate(keys):
+                hit, result = RESULT_CACHE.get(key)
+                if hit:
+                    results[row] = dict(result)
+                else:
+                    missing.append(row)
+
+            if missing:
+                computed = timed_compute([symptom_lists[row] for row in missing], top_k)
+                for row, result in zip(missing, computed):
+                    RESULT_CACHE.put(keys[row], result)
+                    results[row] = dict(result)
+            return results
+
+        if batch:
+            wrapper = cached_batch
+        else:
+            def wrapper(input_symptoms, top_k=None):
+                return cached_batch([input_symptoms], top_k)[0]
+
+        wrapper = functools.wraps(func)(wrapper)
+        wrapper.uncached = func
+        return wrapper
+
+    return decorate
+
+
+def top_k_indices(scores, k):
+    """Positions of the k highest scores, best first; ties go to the lower position.
+
+    Uses partial selection (numpy.partition or heapq.nlargest), so only the
+    winners are ordered rather than every score.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    if numpy_available() and isinstance(scores, np.ndarray):
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        winners = np.concatenate([above, tied])
+        return winners[np.lexsort((winners, -scores[winners]))].tolist()
+    return heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+
+
+def matching_disease_symptoms(input_symptoms, symptoms):
+    """Input symptoms (in input order) that are listed for a disease"""
+    symptoms = set(symptoms)
+    return [symptom for symptom in dict.fromkeys(input_symptoms) if symptom in symptoms]
+
+
+def differential_entry(disease, confidence, matching_symptoms):
+    """One ranked candidate of a differential diagnosis"""
+    return {
+        "disease": disease,
+        "confidence": confidence,
+        "matching_symptoms": matching_symptoms
+    }
+
+
+def _classifier_results(symptom_lists, probabilities, classes, top_k=None):
+    """Results for rows of class probabilities: the most probable disease, with a differential for top_k"""
+    best = probabilities.argmax(axis=1)
+    confidences = probabilities[np.arange(len(best)), best] * 100
+
+    results = []
+    for row, (class_idx, confidence) in enumerate(zip(best, confidences)):
+        disease = str(classes[class_idx])
+        result = {
+            'disease': disease,
+            'confidence': float(confidence)
+        }
+        if top_k:
+            disease_symptom_map = KB.disease_symptom_map
+            result['differential'] = [
+                differential_entry(
+                    str(classes[idx]),
+                    float(probabilities[row, idx] * 100),
+                    matching_disease_symptoms(
+                        symptom_lists[row], disease_symptom_map.get(str(classes[idx]), ())
+                    )
+                )
+                for idx in top_k_indices(probabilities[row], top_k)
+                # Classes the model rules out are not part of the differential
+                if probabilities[row, idx] > 0
+            ]
+        results.append(add_disease_details(result, disease))
+    return results
+
+
+@cached_engine('predict', batch=True, model_version=_model_version)
+def predict_batch(symptom_lists, top_k=None):
+    """Predict diseases for many symptom lists at once, returning results in input order.
+
+    Uses the RandomForest model, or the NumPy Naive Bayes engine when it
+    is not available (see ml_available). With top_k, each result also has a
+    "differential" list of the top_k most probable diseases (only those
+    with a non-zero probability).
+    """
+    symptom_lists = list(symptom_lists)
+    if not symptom_lists:
+        return []
+
+    if ml_available():
+        try:
+            artifact = load_model()
+            model = artifact['model']
+
+            if len(symptom_lists) == 1:
+                # A single input is fastest as a set-membership walk down each tree
+                with instrumentation.timer('predict.encode'):
+                    columns = encode_symptom_columns(symptom_lists, artifact['column_index'])
+                with instrumentation.timer('predict.inference'):
+                    probabilities = model.predict_proba_columns(columns)
+            else:
+                with instrumentation.timer('predict.encode'):
+                    matrix = encode_symptoms(symptom_lists, artifact['column_index'])
+                with instrumentation.timer('predict.inference'):
+                    probabilities = model.predict_proba(matrix)
+            with instrumentation.timer('predict.enrich'):
+                return _classifier_results(symptom_lists, probabilities, model.classes_, top_k)
         except Exception as e:
+            instrumentation.count('predict.ml_errors')
             print(f"Error using ML model: {str(e)}", file=sys.stderr)
             # Fall back to improved pattern matching
-            return predict_with_clinical_relevance(input_symptoms)
+            return predict_with_clinical_relevance_batch(symptom_lists, top_k)
+    elif numpy_available():
+        return predict_with_naive_bayes_batch(symptom_lists, top_k)
     else:
         # Use improved pattern matching
-        return predict_with_clinical_relevance(input_symptoms)
+        return predict_with_clinical_relevance_batch(symptom_lists, top_k)
+
+
+@cached_engine('naive_bayes', batch=True, model_version=_naive_bayes_version)
+def predict_with_naive_bayes_batch(symptom_lists, top_k=None):
+    """Bernoulli Naive Bayes prediction for many symptom lists, in input order"""
+    symptom_lists = list(symptom_lists)
+    if not symptom_lists:
+        return []
+    if not numpy_available():
+        return predict_with_clinical_relevance_batch(symptom_lists, top_k)
 
+    try:
+        artifact = load_naive_bayes()
+        model = artifact['model']
+
+        with instrumentation.timer('naive_bayes.encode'):
+            matrix = encode_symptoms(symptom_lists, artifact['column_index'])
+        with instrumentation.timer('naive_bayes.inference'):
+            probabilities = model.predict_proba(matrix)
+        with instrumentation.timer('naive_bayes.enrich'):
+            return _classifier_results(symptom_lists, probabilities, model.classes_, top_k)
+    except Exception as e:
+        instrumentation.count('naive_bayes.errors')
+        print(f"Error using Naive Bayes model: {str(e)}", file=sys.stderr)
+        return predict_with_clinical_relevance_batch(symptom_lists, top_k)
+
+
+def predict_with_naive_bayes(input_symptoms, top_k=None):
+    """Probabilistic prediction with the NumPy Naive Bayes engine"""
+    return predict_with_naive_bayes_batch([input_symptoms], top_k)[0]
+
+
+def predict(input_symptoms, top_k=None):
+    """Predict disease based on symptoms"""
+    return predict_batch([input_symptoms], top_k)[0]
+
+
+EncodedSymptoms = namedtuple('EncodedSymptoms', ['n_rows', 'rows', 'columns'])
+
+
+class ClinicalRelevanceEngine:
+    """Array form of the clinical relevance scoring.
+
+    Diseases are rows and catalog symptom ids are columns. The incidence is
+    kept bit-packed per symptom (one bit per disease), so it takes an eighth
+    of a byte per disease-symptom pair; scoring unpacks only the columns of
+    the input symptoms and sums them per input, next to per-disease totals
+    precomputed in the catalog records.
+    """
+
+    def __init__(self, catalog, critical_pairs):
+        self.catalog = catalog
+        # Diseases without symptoms can never match
+        self.records = [record for record in catalog.records if record.mask]
+        self.diseases = [record.name for record in self.records]
+        n_symptoms = len(catalog.symptoms)
+        disease_index = {disease: idx for idx, disease in enumerate(self.diseases)}
+
+        # Bit `row` of column_bits[symptom_id] is set when that disease lists the symptom
+        self.column_bits = np.zeros((n_symptoms, (len(self.records) + 7) // 8), dtype=np.uint8)
+        pairs = [(row, symptom_id) for row, record in enumerate(self.records) for symptom_id in iter_bits(record.mask)]
+        if pairs:
+            rows, columns = np.array(pairs, dtype=np.intp).T
+            np.bitwise_or.at(self.column_bits, (columns, rows >> 3), (0x80 >> (rows & 7)).astype(np.uint8))
+
+        self.symptom_counts = np.array([record.symptom_count for record in self.records], dtype=np.float64)
+        self.severity_totals = np.array([record.clinical_severity_total for record in self.records], dtype=np.float64)
+        self.severity = np.array(catalog.severity_weights(3), dtype=np.float64)
+
+        # Critical symptoms: which diseases they point to and how specific they are
+        self.critical_columns = np.array([catalog.symptom_ids[s] for s in critical_pairs], dtype=np.intp)
+        self.critical_position = np.full(n_symptoms, -1, dtype=np.intp)
+        self.critical_position[self.critical_columns] = np.arange(len(self.critical_columns))
+        self.critical_mask = np.zeros((len(self.diseases), len(critical_pairs)), dtype=np.float32)
+        self.specificity = np.zeros(len(critical_pairs))
+        for col, (symptom, diseases) in enumerate(critical_pairs.items()):
+            self.specificity[col] = 1.0 / (len(diseases) + 1)
+            for disease in diseases:
+                if disease in disease_index:
+                    self.critical_mask[disease_index[disease], col] = 1
+        self.critical_incidence = self._unpack(self.critical_columns).T.astype(np.float64)
+
+    def _unpack(self, columns):
+        """Incidence of the given symptom columns: (len(columns), diseases) of 0/1"""
+        return np.unpackbits(self.column_bits[columns], axis=1, count=len(self.records))
+
+    def encode(self, symptom_lists):
+        """The known symptoms of every list as (row, column) pairs, ordered by row; unknown symptoms are ignored"""
+        symptom_ids = self.catalog.symptom_ids
+        rows = []
+        columns = []
+        for row, symptoms in enumerate(symptom_lists):
+            for symptom in dict.fromkeys(symptoms):
+                column = symptom_ids.get(symptom)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        return EncodedSymptoms(len(symptom_lists), np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp))
+
+    def candidate_rows(self, encoded):
+        """Sorted rows of the diseases sharing a symptom with any encoded input"""
+        if not len(encoded.columns):
+            return np.empty(0, dtype=np.intp)
+        present = np.bitwise_or.reduce(self.column_bits[np.unique(encoded.columns)], axis=0)
+        return np.flatnonzero(np.unpackbits(present, count=len(self.records)))
+
+    def score(self, encoded, rows=None):
+        """Scores of the diseases in rows (all diseases by default) for every encoded input.
+
+        Returns (scores, matching_counts, is_critical), each of shape
+        (inputs, len(rows)). Diseases without a matching symptom score -inf.
+        """
+        bits = self._unpack(encoded.columns)
+        if rows is not None:
+            bits = bits[:, rows]
+        rows = slice(None) if rows is None else rows
+
+        # Sum the unpacked columns of each input's symptoms
+        matching = np.zeros((encoded.n_rows, bits.shape[1]))
+        severity_scores = np.zeros((encoded.n_rows, bits.shape[1]))
+        critical_inputs = np.zeros((encoded.n_rows, len(self.critical_columns)))
+        if len(encoded.columns):
+            present, starts = np.unique(encoded.rows, return_index=True)
+            matching[present] = np.add.reduceat(bits, starts, axis=0, dtype=np.float64)
+            severity_scores[present] = np.add.reduceat(bits * self.severity[encoded.columns, None], starts, axis=0)
+            positions = self.critical_position[encoded.columns]
+            critical = positions >= 0
+            critical_inputs[encoded.rows[critical], positions[critical]] = 1
+
+        is_critical = (critical_inputs @ self.critical_mask[rows].T) > 0
+        specificity_bonus = (critical_inputs * self.specificity) @ self.critical_incidence[rows].T
+
+        coverage_ratio = matching / self.symptom_counts[rows]
+        symptom_count_factor = np.minimum(1.0, matching / 5)
+        critical_bonus = np.where(is_critical, 2.0, 1.0)
+
+        scores = (
+            (0.35 * severity_scores / self.severity_totals[rows]) +
+            (0.25 * coverage_ratio) +
+            (0.15 * specificity_bonus) +
+            (0.25 * symptom_count_factor)
+        ) * critical_bonus
+        scores[matching == 0] = -np.inf
+        return scores, matching, is_critical
+
+    def matching_symptoms(self, input_symptoms, disease_idx):
+        """Input symptoms (in input order) that belong to the given disease"""
+        return self.catalog.matching_symptoms(input_symptoms, self.records[disease_idx].mask)
+
+
+def _clinical_relevance_confidence(input_symptoms, score):
+    # Calculate confidence as a percentage (0-100)
+    confidence = min(score * 60, 98)  # Scale and cap confidence
+    
+    # Adjust confidence based on the number of input symptoms
+    # If very few symptoms are provided, reduce confidence
+    if len(input_symptoms) < 3:
+        confidence = confidence * 0.7
+    return confidence
 
-def predict_with_clinical_relevance(input_symptoms):
+
+def _clinical_relevance_result(input_symptoms, ranked, top_k=None):
+    """Build the result from (disease, score, matching_symptoms) winners, best first"""
+    disease, score, matching_symptoms = ranked[0]
+    result = {
+        "disease": disease,
+        "confidence": _clinical_relevance_confidence(input_symptoms, score),
+        "matching_symptoms": matching_symptoms,
+        "matching_count": len(matching_symptoms)
+    }
+    if top_k:
+        _with_differential(result, input_symptoms, ranked, _clinical_relevance_confidence)
+    
+    # Add description and precautions if available
+    return add_disease_details(result, disease)
+
+
+def _with_differential(result, input_symptoms, ranked, confidence):
+    result["differential"] = [
+        differential_entry(disease, confidence(input_symptoms, score), matching_symptoms)
+        for disease, score, matching_symptoms in ranked
+    ]
+    return result
+
+
+@cached_engine('clinical_relevance', batch=True)
+def predict_with_clinical_relevance_batch(symptom_lists, top_k=None):
+    """Clinical relevance scoring for many symptom lists, in input order"""
+    symptom_lists = list(symptom_lists)
+    if not numpy_available():
+        return [_clinical_relevance_without_numpy(symptoms, top_k) for symptoms in symptom_lists]
+
+    engine = KB.clinical_engine
+    with instrumentation.timer('clinical_relevance.encode'):
+        encoded = engine.encode(symptom_lists)
+    with instrumentation.timer('clinical_relevance.score'):
+        # Only diseases sharing a symptom with some input can score
+        rows = engine.candidate_rows(encoded)
+        scores, _, _ = engine.score(encoded, rows)
+
+    with instrumentation.timer('clinical_relevance.enrich'):
+        results = []
+        for row, input_symptoms in enumerate(symptom_lists):
+            winners = [idx for idx in top_k_indices(scores[row], top_k or 1) if scores[row, idx] != -np.inf]
+            if not input_symptoms:
+                results.append({
+                    "disease": "Unknown",
+                    "confidence": 0,
+                    "error": "No symptoms provided"
+                })
+            elif not winners:
+                # Fall back to the basic pattern matching if no matches were found
+                results.append(predict_with_pattern_matching(input_symptoms, top_k))
+            else:
+                # Explanations are only built for the winners
+                ranked = [
+                    (engine.diseases[rows[idx]], float(scores[row, idx]),
+                     engine.matching_symptoms(input_symptoms, rows[idx]))
+                    for idx in winners
+                ]
+                results.append(_clinical_relevance_result(input_symptoms, ranked, top_k))
+    return results
+
+
+def predict_with_clinical_relevance(input_symptoms, top_k=None):
     """Advanced pattern matching with clinical relevance scoring"""
+    return predict_with_clinical_relevance_batch([input_symptoms], top_k)[0]
+
+
+def _clinical_relevance_without_numpy(input_symptoms, top_k=None):
+    """Per-disease loop used when NumPy is not installed"""
     if not input_symptoms:
         return {
             "disease": "Unknown",
@@ -412,40 +1723,42 @@ def predict_with_clinical_relevance(input_symptoms):
                 matched_critical_symptoms[disease].append(symptom)
     
     # Calculate scores for all diseases
-    disease_scores = {}
-    detailed_matches = {}
+    disease_scores = []
+    catalog = KB.catalog
+    severity = catalog.severity_weights(3)
+    input_ids, input_mask = catalog.encode(input_symptoms)
     
-    for disease, symptoms in DISEASE_SYMPTOM_MAP.items():
-        # Skip if no symptoms are defined for this disease
-        if not symptoms:
-            continue
-            
+    for record in catalog.candidate_records(input_ids):
         # Find matching symptoms
-        matching = set(input_symptoms) & set(symptoms)
+        matching = input_mask & record.mask
         
         if matching:
+            matching_ids = [symptom_id for symptom_id in input_ids if matching >> symptom_id & 1]
+            matching_count = popcount(matching)
+            
             # Calculate various scoring factors
             
             # 1. Severity score - sum of severity values of matching symptoms
-            severity_score = sum(SYMPTOM_SEVERITY.get(symptom, 3) for symptom in matching)
+            severity_score = sum(severity[symptom_id] for symptom_id in matching_ids)
             
             # 2. Coverage ratio - percentage of disease symptoms matched
-            coverage_ratio = len(matching) / len(symptoms)
+            coverage_ratio = matching_count / record.symptom_count
             
             # 3. Critical symptom bonus
-            critical_bonus = 2.0 if disease in critical_diseases else 1.0
+            critical_bonus = 2.0 if record.name in critical_diseases else 1.0
             
             # 4. Specific symptom weights
             # High specificity symptoms get higher weight 
             specificity_bonus = 0
-            for symptom in matching:
+            for symptom_id in matching_ids:
                 # If this symptom specifically points to fewer diseases, it's more specific
+                symptom = catalog.symptoms[symptom_id]
                 if symptom in CRITICAL_SYMPTOM_DISEASE_PAIRS:
                     specificity = 1.0 / (len(CRITICAL_SYMPTOM_DISEASE_PAIRS[symptom]) + 1)
                     specificity_bonus += specificity
             
             # 5. Symptom count factor - more matching symptoms is better
-            symptom_count_factor = min(1.0, len(matching) / 5)  # Cap at 5 symptoms
+            symptom_count_factor = min(1.0, matching_count / 5)  # Cap at 5 symptoms
             
             # Final score calculation - weighted combination of factors
             # The weighting emphasizes:
@@ -453,157 +1766,714 @@ def predict_with_clinical_relevance(input_symptoms):
             # 2. Severity of the matching symptoms
             # 3. How many of the disease's key symptoms are present
             final_score = (
-                (0.35 * severity_score / max(1, sum(SYMPTOM_SEVERITY.get(s, 3) for s in symptoms))) + 
+                (0.35 * severity_score / record.clinical_severity_total) + 
                 (0.25 * coverage_ratio) + 
                 (0.15 * specificity_bonus) + 
                 (0.25 * symptom_count_factor)
             ) * critical_bonus
             
-            disease_scores[disease] = final_score
-            detailed_matches[disease] = {
-                "matching_symptoms": list(matching),
-                "matching_count": len(matching),
-                "total_symptoms": len(symptoms),
-                "severity_score": severity_score,
-                "coverage_ratio": coverage_ratio,
-                "is_critical": disease in critical_diseases
-            }
+            disease_scores.append((record, final_score))
     
-    # Find the disease with the highest score
+    # Find the diseases with the highest scores
     if disease_scores:
-        predicted_disease = max(disease_scores.items(), key=lambda x: x[1])[0]
-        
-        # Calculate confidence as a percentage (0-100)
-        confidence = min(disease_scores[predicted_disease] * 60, 98)  # Scale and cap confidence
-        
-        # Adjust confidence based on the number of input symptoms
-        # If very few symptoms are provided, reduce confidence
-        if len(input_symptoms) < 3:
-            confidence = confidence * 0.7
-        
-        result = {
-            "disease": predicted_disease,
-            "confidence": confidence,
-            "matching_symptoms": detailed_matches[predicted_disease]["matching_symptoms"],
-            "matching_count": detailed_matches[predicted_disease]["matching_count"]
-        }
-        
-        # Add description and precautions if available
-        if predicted_disease in DISEASE_DESCRIPTIONS:
-            result["description"] = DISEASE_DESCRIPTIONS[predicted_disease]
-        
-        if predicted_disease in DISEASE_PRECAUTIONS:
-            result["precautions"] = DISEASE_PRECAUTIONS[predicted_disease]
-        
-        return result
+        scores = [score for _, score in disease_scores]
+        ranked = []
+        for idx in top_k_indices(scores, top_k or 1):
+            record, score = disease_scores[idx]
+            ranked.append((record.name, score, catalog.matching_symptoms(input_symptoms, record.mask)))
+
+        return _clinical_relevance_result(input_symptoms, ranked, top_k)
     else:
         # Fall back to the basic pattern matching if no matches were found
-        return predict_with_pattern_matching(input_symptoms)
+        return predict_with_pattern_matching(input_symptoms, top_k)
 
 
-def predict_with_severity(input_symptoms):
+def _severity_confidence(input_symptoms, score):
+    # Calculate confidence (convert score to percentage)
+    return min(score * 100, 100)  # Cap at 100%
+
+
+@cached_engine('severity')
+def predict_with_severity(input_symptoms, top_k=None):
     """Pattern matching algorithm using dataset.csv and symptom severity"""
-    max_score = 0
-    predicted_disease = "Unknown"
-    matched_symptoms = {}
+    disease_scores = []
+    catalog = KB.catalog
+    severity = catalog.severity_weights(1)
+    input_ids, input_mask = catalog.encode(input_symptoms)
     
-    # Calculate the total severity score of input symptoms
-    input_severity_total = sum(SYMPTOM_SEVERITY.get(symptom, 1) for symptom in input_symptoms)
-    
-    for disease, symptoms in DISEASE_SYMPTOM_MAP.items():
+    for record in catalog.candidate_records(input_ids):
         # Find the symptoms that match between input and disease
-        matching = set(input_symptoms) & set(symptoms)
+        matching = input_mask & record.mask
         
         if matching:
+            matching_count = popcount(matching)
+            
             # Calculate weighted score based on symptom severity
-            severity_score = sum(SYMPTOM_SEVERITY.get(symptom, 1) for symptom in matching)
+            severity_score = sum(severity[symptom_id] for symptom_id in input_ids if matching >> symptom_id & 1)
             
             # Calculate coverage score (what percentage of disease symptoms are matched)
-            coverage = len(matching) / len(symptoms) if len(symptoms) > 0 else 0
+            coverage = matching_count / record.symptom_count if record.symptom_count > 0 else 0
             
             # Calculate input coverage (what percentage of input symptoms are matched)
-            input_coverage = len(matching) / len(input_symptoms) if len(input_symptoms) > 0 else 0
+            input_coverage = matching_count / len(input_symptoms) if len(input_symptoms) > 0 else 0
             
             # Calculate severity coverage (what percentage of total severity is matched)
-            disease_severity_total = sum(SYMPTOM_SEVERITY.get(symptom, 1) for symptom in symptoms)
+            disease_severity_total = record.severity_total
             severity_coverage = severity_score / disease_severity_total if disease_severity_total > 0 else 0
             
             # Calculate final score (weighted combination of different metrics)
             final_score = (0.4 * coverage) + (0.3 * input_coverage) + (0.3 * severity_coverage)
             
-            if final_score > max_score:
-                max_score = final_score
-                predicted_disease = disease
-                matched_symptoms = {symptom: SYMPTOM_SEVERITY.get(symptom, 1) for symptom in matching}
+            if final_score > 0:
+                disease_scores.append((record, final_score))
     
     # If no disease found in dataset.csv, fall back to the original map
-    if predicted_disease == "Unknown":
-        return predict_with_pattern_matching(input_symptoms)
+    if not disease_scores:
+        return predict_with_pattern_matching(input_symptoms, top_k)
     
-    # Calculate confidence (convert score to percentage)
-    confidence = min(max_score * 100, 100)  # Cap at 100%
+    ranked = []
+    for idx in top_k_indices([score for _, score in disease_scores], top_k or 1):
+        record, score = disease_scores[idx]
+        ranked.append((record.name, score, catalog.matching_symptoms(input_symptoms, record.mask)))
+    predicted_disease, max_score, matched_symptoms = ranked[0]
     
     result = {
         "disease": predicted_disease,
-        "confidence": confidence,
+        "confidence": _severity_confidence(input_symptoms, max_score),
         "matched_symptoms": len(matched_symptoms)
     }
+    if top_k:
+        _with_differential(result, input_symptoms, ranked, _severity_confidence)
     
     # Add description and precautions if available
-    if predicted_disease in DISEASE_DESCRIPTIONS:
-        result["description"] = DISEASE_DESCRIPTIONS[predicted_disease]
-    
-    if predicted_disease in DISEASE_PRECAUTIONS:
-        result["precautions"] = DISEASE_PRECAUTIONS[predicted_disease]
-        
-    return result
+    return add_disease_details(result, predicted_disease)
 
 
-def predict_with_pattern_matching(input_symptoms):
+@cached_engine('pattern_matching')
+def predict_with_pattern_matching(input_symptoms, top_k=None):
     """Simple pattern matching algorithm for disease prediction using fallback data"""
-    max_match = 0
-    predicted_disease = "Unknown"
+    disease_matches = []
+    input_ids, input_mask = FALLBACK_CATALOG.encode(input_symptoms)
+    
+    for record in FALLBACK_CATALOG.candidate_records(input_ids):
+        matches = popcount(input_mask & record.mask)
+        if matches > 0:
+            disease_matches.append((record, matches))
     
-    for disease, symptoms in FALLBACK_DISEASE_MAP.items():
-        matches = len(set(input_symptoms) & set(symptoms))
-        if matches > max_match:
-            max_match = matches
-            predicted_disease = disease
+    ranked = []
+    for idx in top_k_indices([matches for _, matches in disease_matches], top_k or 1):
+        record, matches = disease_matches[idx]
+        # Calculate confidence based on the number of matched symptoms
+        confidence = (matches / record.symptom_count) * 100 if record.symptom_count else 0
+        ranked.append((record.name, confidence, FALLBACK_CATALOG.matching_symptoms(input_symptoms, record.mask)))
     
-    # Calculate confidence based on the number of matched symptoms
-    if predicted_disease != "Unknown":
-        total_symptoms = len(FALLBACK_DISEASE_MAP.get(predicted_disease, []))
-        confidence = (max_match / total_symptoms) * 100 if total_symptoms > 0 else 0
+    if ranked:
+        predicted_disease, confidence, _ = ranked[0]
     else:
-        confidence = 0
+        predicted_disease, confidence = "Unknown", 0
     
     result = {
         "disease": predicted_disease,
         "confidence": confidence
     }
+    if top_k:
+        _with_differential(result, input_symptoms, ranked, lambda _, confidence: confidence)
     
     # Add description and precautions if available
-    if predicted_disease in DISEASE_DESCRIPTIONS:
-        result["description"] = DISEASE_DESCRIPTIONS[predicted_disease]
+    if predicted_disease in KB.descriptions:
+        result["description"] = KB.descriptions[predicted_disease]
     elif predicted_disease in FALLBACK_DESCRIPTIONS:
         result["description"] = FALLBACK_DESCRIPTIONS[predicted_disease]
     
-    if predicted_disease in DISEASE_PRECAUTIONS:
-        result["precautions"] = DISEASE_PRECAUTIONS[predicted_disease]
+    if predicted_disease in KB.precautions:
+        result["precautions"] = KB.precautions[predicted_disease]
     elif predicted_disease in FALLBACK_PRECAUTIONS:
         result["precautions"] = FALLBACK_PRECAUTIONS[predicted_disease]
         
     return result
 
 
+# Batch entry points by engine name, used by predict_batch_parallel
+BATCH_ENGINES = {
+    "predict": predict_batch,
+    "clinical_relevance": predict_with_clinical_relevance_batch,
+    "naive_bayes": predict_with_naive_bayes_batch,
+    "severity": lambda symptom_lists, top_k=None: [predict_with_severity(s, top_k) for s in symptom_lists],
+    "pattern_matching": lambda symptom_lists, top_k=None: [predict_with_pattern_matching(s, top_k) for s in symptom_lists],
+}
+
+
+def effective_jobs(n_jobs=None):
+    """Number of worker processes for n_jobs (default N_JOBS; -1 means one per core)"""
+    n_jobs = N_JOBS if n_jobs is None else n_jobs
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def _score_shard(shard):
+    engine, symptom_lists, top_k = shard
+    return BATCH_ENGINES[engine](symptom_lists, top_k)
+
+
+def predict_batch_parallel(symptom_lists, top_k=None, engine="predict", n_jobs=None, shard_size=None):
+    """Score many symptom lists on a pool of forked worker processes, in input order.
+
+    The knowledge base (and the model for the ML engine) is loaded before
+    forking, so workers share it copy-on-write instead of loading their own.
+    Rows are split into contiguous shards, several per worker to even out
+    the load. Where fork is unavailable, or a single worker is requested,
+    the batch runs in this process.
+    """
+    if engine not in BATCH_ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    symptom_lists = list(symptom_lists)
+    processes = min(effective_jobs(n_jobs), max(1, len(symptom_lists)))
+    if processes == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return BATCH_ENGINES[engine](symptom_lists, top_k)
+
+    # Load everything the workers need before they are forked
+    KB.load_all()
+    if engine == "predict" and ml_available():
+        try:
+            load_model()
+        except Exception as e:
+            print(f"Error loading ML model: {str(e)}", file=sys.stderr)
+
+    if shard_size is None:
+        shard_size = -(-len(symptom_lists) // (processes * 4))
+    shards = [
+        (engine, symptom_lists[start:start + shard_size], top_k)
+        for start in range(0, len(symptom_lists), shard_size)
+    ]
+    with instrumentation.timer(f'{engine}.parallel'):
+        with multiprocessing.get_context('fork').Pool(processes) as pool:
+            # map returns shard results in submission order
+            scored = pool.map(_score_shard, shards, chunksize=1)
+    return [result for results in scored for result in results]
+
+
+def _top_k_option(request):
+    top_k = request.get('top_k')
+    if top_k is not None and (not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1):
+        raise ValueError("top_k must be a positive integer")
+    return top_k
+
+
+def _engine_option(request):
+    """Batch function of the engine named by the request (default: predict)"""
+    engine = request.get('engine', 'predict')
+    if engine not in BATCH_ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
+    return BATCH_ENGINES[engine]
+
+
+def _run_engine(request, inputs):
+    """Score inputs with the requested engine; with "resolve": true free-form names are mapped to the vocabulary first"""
+    engine = _engine_option(request)
+    if not request.get('resolve'):
+        return engine(inputs, _top_k_option(request))
+    resolved = [resolve_symptoms(symptoms) for symptoms in inputs]
+    results = engine([symptoms for symptoms, _, _ in resolved], _top_k_option(request))
+    return [
+        dict(result, unresolved_symptoms=unresolved) if isinstance(result, dict) else result
+        for result, (_, _, unresolved) in zip(results, resolved)
+    ]
+
+
+def _is_symptom_list(symptoms):
+    return isinstance(symptoms, list) and all(isinstance(symptom, str) for symptom in symptoms)
+
+
+def _op_predict(request):
+    symptoms = request.get('symptoms')
+    if not _is_symptom_list(symptoms):
+        raise ValueError("Invalid symptoms format")
+    return _run_engine(request, [symptoms])[0]
+
+
+def _op_predict_batch(request):
+    inputs = request.get('inputs')
+    if not isinstance(inputs, list) or not all(_is_symptom_list(symptoms) for symptoms in inputs):
+        raise ValueError("Invalid inputs format")
+    return _run_engine(request, inputs)
+
+
+def _op_symptoms(request):
+    vocabulary = get_symptom_vocabulary()
+    # Let clients that already hold this version skip the list
+    if request.get('if_none_match') == vocabulary.version:
+        return {"version": vocabulary.version, "not_modified": True}
+    return {"version": vocabulary.version, "symptoms": list(vocabulary.symptoms)}
+
+
+def _op_complete(request):
+    prefix = request.get('prefix')
+    if not isinstance(prefix, str):
+        raise ValueError("Invalid prefix")
+    limit = request.get('limit', 10)
+    if not isinstance(limit, int) or limit < 1:
+        raise ValueError("Invalid limit")
+    return {"version": get_symptom_vocabulary().version, "matches": complete_symptoms(prefix, limit)}
+
+
+def _op_resolve(request):
+    symptoms = request.get('symptoms')
+    if not isinstance(symptoms, list):
+        raise ValueError("Invalid symptoms format")
+    resolved, matches, unresolved = resolve_symptoms(symptoms)
+    return {"resolved": resolved, "matches": matches, "unresolved": unresolved}
+
+
+def _op_candidates(request):
+    symptoms = request.get('symptoms')
+    if not isinstance(symptoms, list):
+        raise ValueError("Invalid symptoms format")
+    return candidates(symptoms)
+
+
+def _op_stats(request):
+    return {"result_cache": RESULT_CACHE.stats(), "metrics": instrumentation.stats()}
+
+
+def _op_reload(request):
+    changed = reload_knowledge_base()
+    return {"version": KB.version, "changed": changed}
+
+
+def _op_update(request):
+    cases = request.get('cases')
+    if not isinstance(cases, list):
+        raise ValueError("Invalid cases format")
+    return update(cases)
+
+
+def _op_compact(request):
+    return {"compacted_cases": compact_models()}
+
+
+def _op_ping(request):
+    return "pong"
+
+
+# Operations understood by the long-lived server (--serve)
+SERVER_OPS = {
+    "predict": _op_predict,
+    "predict_batch": _op_predict_batch,
+    "symptoms": _op_symptoms,
+    "complete": _op_complete,
+    "resolve": _op_resolve,
+    "candidates": _op_candidates,
+    "stats": _op_stats,
+    "reload": _op_reload,
+    "update": _op_update,
+    "compact": _op_compact,
+    "ping": _op_ping
+}
+
+
+def handle_request_line(line):
+    """Handle one newline-delimited JSON request and return the JSON response line.
+
+    Requests look like {"id": 1, "op": "predict", "symptoms": [...]}; the id is
+    echoed back so clients can match responses to requests that are in flight
+    concurrently. With "timings": true the response also carries the time
+    spent in each pipeline stage, in milliseconds.
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("Request must be a JSON object")
+        request_id = request.get('id')
+        op = request.get('op', 'predict')
+        if op not in SERVER_OPS:
+            raise ValueError(f"Unknown op: {op}")
+        instrumentation.count(f'requests.{op}')
+        with instrumentation.profiled(op), instrumentation.collect_timings(bool(request.get('timings'))) as collected:
+            # The whole request sees one knowledge base version
+            with pinned_knowledge_base(), instrumentation.timer(f'request.{op}'):
+                response = {"id": request_id, "result": SERVER_OPS[op](request)}
+        if collected.timings is not None:
+            response["timings"] = collected.timings
+    except json.JSONDecodeError:
+        instrumentation.count('requests.errors')
+        response = {"id": request_id, "error": "Invalid JSON request"}
+    except Exception as e:
+        instrumentation.count('requests.errors')
+        response = {"id": request_id, "error": str(e)}
+    return KB.enrichment.dumps_response(response) + "\n"
+
+
+def serve_stream(reader, writer, executor):
+    """Read requests from reader and write responses to writer as they complete"""
+    write_lock = threading.Lock()
+    pending = []
+
+    def respond(line):
+        response = handle_request_line(line)
+        with write_lock:
+            writer.write(response)
+            writer.flush()
+
+    for line in reader:
+        if line.strip():
+            pending.append(executor.submit(respond, line))
+            pending = [future for future in pending if not future.done()]
+
+    # Finish requests that are still in flight before the stream is closed
+    for future in pending:
+        future.result()
+
+
+def _micro_batch_key(request):
+    """Validate a predict request and return the key of the micro-batches it may join"""
+    if not _is_symptom_list(request.get('symptoms')):
+        raise ValueError("Invalid symptoms format")
+    _engine_option(request)
+    return (request.get('engine', 'predict'), _top_k_option(request), bool(request.get('resolve')))
+
+
+def _run_micro_batch(key, requests):
+    """Score a micro-batch of predict requests with one engine call and build their responses"""
+    engine, top_k, resolve = key
+    instrumentation.count('requests.predict', len(requests))
+    want_timings = any(request.get('timings') for request in requests)
+    with instrumentation.profiled('predict', len(requests)), instrumentation.collect_timings(want_timings) as collected:
+        with pinned_knowledge_base(), instrumentation.timer('request.predict_micro_batch'):
+            results = _run_engine(
+                {"engine": engine, "top_k": top_k, "resolve": resolve},
+                [request['symptoms'] for request in requests]
+            )
+
+    responses = []
+    for request, result in zip(requests, results):
+        response = {"id": request.get('id'), "result": result}
+        if request.get('timings'):
+            # Stage timings are those of the whole batch the request was scored in
+            response["timings"] = collected.timings
+            response["batch_size"] = len(requests)
+        responses.append(response)
+    return responses
+
+
+async def _serve_async_stream(read_line, write, batcher, executor, max_pending):
+    """Answer the requests of one stream, sending predict requests through the micro-batcher.
+
+    At most max_pending requests of the stream are in flight; beyond that
+    the stream is not read until one of them completes.
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_pending)
+    tasks = set()
+
+    async def respond(line):
+        try:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                request = None
+            if isinstance(request, dict) and request.get('op', 'predict') == 'predict':
+                try:
+                    response = await batcher.submit(_micro_batch_key(request), request)
+                except Exception as e:
+                    instrumentation.count('requests.errors')
+                    response = {"id": request.get('id'), "error": str(e)}
+                response_line = KB.enrichment.dumps_response(response) + "\n"
+            else:
+                response_line = await loop.run_in_executor(executor, handle_request_line, line)
+            await write(response_line)
+        finally:
+            slots.release()
+
+    while True:
+        line = await read_line()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        await slots.acquire()
+        task = loop.create_task(respond(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    # Finish requests that are still in flight before the stream is closed
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _serve_async(socket_path, executor, batch_window, max_batch_size, max_pending):
+    """asyncio front end of serve(): stdin/stdout or a Unix socket, with micro-batching"""
+    import asyncio
+    from micro_batch import MicroBatcher
+
+    loop = asyncio.get_running_loop()
+    batcher = MicroBatcher(
+        _run_micro_batch, executor,
+        max_batch_size=max_batch_size,
+        window=batch_window,
+        max_queue=max_pending
+    )
+    batcher.start()
+    try:
+        if socket_path is None:
+            print("Serving predictions on stdin/stdout (micro-batching)", file=sys.stderr)
+            # Reading stdin blocks, so it gets a thread of its own
+            with ThreadPoolExecutor(max_workers=1) as stdin_reader:
+                async def write(response_line):
+                    sys.stdout.write(response_line)
+                    sys.stdout.flush()
+
+                await _serve_async_stream(
+                    lambda: loop.run_in_executor(stdin_reader, sys.stdin.readline),
+                    write, batcher, executor, max_pending
+                )
+        else:
+            async def handle_connection(reader, writer):
+                async def read_line():
+                    return (await reader.readline()).decode('utf-8')
+
+                async def write(response_line):
+                    writer.write(response_line.encode('utf-8'))
+                    await writer.drain()
+
+                try:
+                    await _serve_async_stream(read_line, write, batcher, executor, max_pending)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    writer.close()
+
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(handle_connection, path=socket_path)
+            print(f"Serving predictions on {socket_path} (micro-batching)", file=sys.stderr)
+            try:
+                async with server:
+                    await server.serve_forever()
+            finally:
+                os.remove(socket_path)
+    finally:
+        await batcher.stop()
+
+
+class _SocketRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        reader = self.connection.makefile('r', encoding='utf-8')
+        writer = self.connection.makefile('w', encoding='utf-8')
+        try:
+            serve_stream(reader, writer, self.server.executor)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def warm_up():
+    """Load datasets, indexes and the model up front so the first request is not slow"""
+    KB.load_all()
+    if ml_available():
+        try:
+            load_model()
+        except Exception as e:
+            print(f"Error warming up ML model: {str(e)}", file=sys.stderr)
+    if numpy_available():
+        try:
+            load_naive_bayes()
+        except Exception as e:
+            print(f"Error warming up Naive Bayes model: {str(e)}", file=sys.stderr)
+
+
+def serve(socket_path=None, workers=4, eager=False, watch_interval=None, compact_interval=None,
+          micro_batch=False, batch_window=0.002, max_batch_size=64, max_pending=1024):
+    """Run as a resident worker speaking newline-delimited JSON.
+
+    Without socket_path requests are read from stdin and responses written to
+    stdout; otherwise a Unix socket server is started at socket_path. With
+    eager, data and model are loaded before the first request arrives. With
+    watch_interval, the data files are polled that often (in seconds) and
+    the knowledge base is reloaded when they change. With compact_interval,
+    the models are refitted from scratch that often (in seconds) if cases
+    were added through the update op since the last refit.
+
+    With micro_batch, an asyncio front end collects concurrent predict
+    requests into batches of up to max_batch_size, waiting up to
+    batch_window seconds during bursts, and scores each batch with one
+    engine call (see MicroBatcher). At most max_pending requests per
+    stream are in flight.
+    """
+    if eager:
+        warm_up()
+    watcher = None
+    if watch_interval:
+        watcher = KnowledgeBaseWatcher(watch_interval)
+        watcher.start()
+    compactor = None
+    if compact_interval:
+        compactor = ModelCompactor(compact_interval)
+        compactor.start()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        if micro_batch:
+            # asyncio is only imported by the micro-batching server, to keep it off the CLI's startup path
+            import asyncio
+            try:
+                asyncio.run(_serve_async(socket_path, executor, batch_window, max_batch_size, max_pending))
+            except KeyboardInterrupt:
+                pass
+        elif socket_path is None:
+            print("Serving predictions on stdin/stdout", file=sys.stderr)
+            serve_stream(sys.stdin, sys.stdout, executor)
+        else:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            with _ThreadingUnixServer(socket_path, _SocketRequestHandler) as server:
+                server.executor = executor
+                print(f"Serving predictions on {socket_path}", file=sys.stderr)
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    os.remove(socket_path)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        if compactor is not None:
+            compactor.stop()
+        executor.shutdown(wait=True)
+
+
+def read_batch_inputs(input_path):
+    """Symptom lists from a JSON lines file: one list (or {"symptoms": [...]}) per line"""
+    symptom_lists = []
+    with open(input_path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            value = json.loads(line)
+            symptoms = value.get('symptoms') if isinstance(value, dict) else value
+            if not isinstance(symptoms, list):
+                raise ValueError(f"Invalid symptoms format on line {line_number}")
+            symptom_lists.append(symptoms)
+    return symptom_lists
+
+
+def write_batch_results(results, output_path=None, output_format='jsonl'):
+    """Write results to output_path, or stdout, as JSON lines (jsonl), compact JSON lines or binary.
+
+    See response_encoding for the formats; read binary output back with
+    response_encoding.read_binary_results.
+    """
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    enrichment = KB.enrichment
+    if output_path is None:
+        stream = sys.stdout.buffer if output_format == 'binary' else sys.stdout
+        enrichment.write_results(results, stream, output_format)
+        stream.flush()
+        return
+    with open(output_path, 'wb' if output_format == 'binary' else 'w') as f:
+        enrichment.write_results(results, f, output_format)
+
+
+def _get_option(args, name, default=None):
+    """Value following name in args, e.g. --socket /tmp/predictor.sock"""
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args):
+            return args[idx + 1]
+    return default
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
+        jobs = _get_option(sys.argv, '--jobs')
+        if jobs is not None:
+            N_JOBS = int(jobs)
+
         if sys.argv[1] == '--get-symptoms':
             print(json.dumps(get_all_symptoms()))
+        elif sys.argv[1] == '--complete':
+            limit = _get_option(sys.argv, '--limit')
+            print(json.dumps(complete_symptoms(sys.argv[2], int(limit) if limit is not None else 10)))
+        elif sys.argv[1] == '--resolve':
+            resolved, matches, unresolved = resolve_symptoms(json.loads(sys.argv[2]))
+            print(json.dumps({"resolved": resolved, "matches": matches, "unresolved": unresolved}))
+        elif sys.argv[1] == '--predict-batch':
+            # Batch re-scoring: JSON lines in, one result per input out, in input order
+            output_format = _get_option(sys.argv, '--output-format', 'jsonl')
+            if output_format not in BATCH_FORMATS:
+                raise SystemExit(f"Unknown output format: {output_format} (expected one of {', '.join(BATCH_FORMATS)})")
+            symptom_lists = read_batch_inputs(sys.argv[2])
+            top_k = _get_option(sys.argv, '--top-k')
+            results = predict_batch_parallel(
+                symptom_lists,
+                top_k=int(top_k) if top_k is not None else None,
+                engine=_get_option(sys.argv, '--engine', 'predict')
+            )
+            write_batch_results(results, _get_option(sys.argv, '--output'), output_format)
+        elif sys.argv[1] in ('--train', '--warm'):
+            # --train always refits, --warm only builds the artifacts if they are missing or stale
+            if not numpy_available():
+                print(json.dumps({"error": "numpy not available"}))
+                sys.exit(1)
+            force = sys.argv[1] == '--train'
+            naive_bayes = train_naive_bayes(force=force)
+            summary = {"naive_bayes": naive_bayes['key'], "classes": len(naive_bayes['classes'])}
+            if ml_available() and (sklearn_available() or not force):
+                summary["model"] = train_model(force=force)['key']
+            print(json.dumps(summary))
+        elif sys.argv[1] == '--update':
+            # Add labeled cases (JSON lines of {"symptoms": [...], "disease": "..."}) incrementally;
+            # the updated forest is saved, and compaction is left to {"op": "compact"} or --compact-interval
+            with open(sys.argv[2], 'r') as f:
+                cases = [json.loads(line) for line in f if line.strip()]
+            print(json.dumps(update(cases)))
+        elif sys.argv[1] == '--build-training-data':
+            # Compile a one-hot CSV (Training.csv by default) into the deduplicated binary form
+            if not numpy_available():
+                print(json.dumps({"error": "numpy not available"}))
+                sys.exit(1)
+            csv_path = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else None
+            data = load_training_data(csv_path, rebuild=True)
+            print(json.dumps({
+                "training_data": get_training_data_path(csv_path or get_dataset_path('Training.csv')),
+                "rows": data.n_rows,
+                "patterns": data.n_patterns
+            }))
+        elif sys.argv[1] == '--build-snapshot':
+            snapshot_path = build_kb_snapshot(_get_option(sys.argv, '--output'))
+            print(json.dumps({"snapshot": snapshot_path}))
+        elif sys.argv[1] == '--serve':
+            cache_size = _get_option(sys.argv, '--cache-size')
+            cache_ttl = _get_option(sys.argv, '--cache-ttl')
+            configure_result_cache(
+                maxsize=int(cache_size) if cache_size is not None else None,
+                ttl=float(cache_ttl) if cache_ttl is not None else None
+            )
+            if '--metrics' in sys.argv:
+                instrumentation.enable()
+            serve(socket_path=_get_option(sys.argv, '--socket'),
+                  workers=int(_get_option(sys.argv, '--workers', 4)),
+                  eager='--eager' in sys.argv,
+                  watch_interval=float(_get_option(sys.argv, '--watch-interval', 2)) if '--watch' in sys.argv else None,
+                  compact_interval=float(_get_option(sys.argv, '--compact-interval', 0)) or None,
+                  micro_batch='--micro-batch' in sys.argv,
+                  batch_window=float(_get_option(sys.argv, '--batch-window-ms', 2)) / 1000,
+                  max_batch_size=int(_get_option(sys.argv, '--max-batch-size', 64)),
+                  max_pending=int(_get_option(sys.argv, '--max-pending', 1024)))
         else:
             try:
                 symptoms = json.loads(sys.argv[1])
-                result = predict(symptoms)
+                with instrumentation.collect_timings('--timings' in sys.argv) as collected:
+                    result = predict(symptoms)
+                if collected.timings is not None:
+                    result["timings"] = collected.timings
                 print(json.dumps(result))
             except json.JSONDecodeError:
                 print(json.dumps({"error": "Invalid symptoms format"}))
@@ -0,0 +1,330 @@
+"""Evaluate the prediction engines for accuracy and speed.
+
+Every engine scores the held-out rows of Testing.csv, sharded over a pool
+of worker processes (see predict_batch_parallel). Both CSVs are read in
+their deduplicated form (see training_data): each distinct case is scored
+once and counts as many times as it occurs. For each engine this reports:
+
+- accuracy and top-k accuracy (the true disease among the k best)
+- a confusion summary: the most frequent (true, predicted) mistakes and
+  the diseases with the lowest recall
+- single-query latency percentiles and batch throughput, measured with the
+  result cache disabled
+- accuracy per millisecond of mean latency, to compare engines on the
+  trade-off between the two
+
+It also checks, with and without a differential, that the results encoded
+with pre-rendered enrichment (see response_encoding) read exactly as
+json.dumps writes them.
+
+With --folds K, the trainable engines (predict and naive_bayes) are also
+cross-validated on Training.csv: each of K stratified folds of the distinct
+cases is held out in turn and scored by a model fitted, with the case
+counts as sample weights, on the rest. The knowledge base engines
+learn nothing from Training.csv and are scored on the same folds as-is.
+
+    python lib/ml/evaluate.py --top-k 3 --folds 5 --output eval.json
+"""
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ML_DIR)
+
+import disease_predictor as dp
+from benchmark import percentiles
+
+ENGINES = ['predict', 'naive_bayes', 'clinical_relevance', 'severity', 'pattern_matching']
+TRAINABLE_ENGINES = ('predict', 'naive_bayes')
+
+# Entries kept in each confusion summary list
+CONFUSION_SUMMARY_SIZE = 10
+
+
+def read_labeled_cases(path):
+    """(symptom_lists, labels) of a one-hot Training.csv/Testing.csv file, one per row"""
+    with open(path, 'r') as f:
+        csv_reader = csv.reader(f)
+        header = [column.strip() for column in next(csv_reader)]
+        label_col = header.index('prognosis')
+        symptom_lists = []
+        labels = []
+        for row in csv_reader:
+            if not row:
+                continue
+            symptom_lists.append([
+                header[idx] for idx, value in enumerate(row)
+                if idx != label_col and header[idx] and value.strip() == '1'
+            ])
+            labels.append(row[label_col].strip())
+    return symptom_lists, labels
+
+
+def read_held_out_cases():
+    """(symptom_lists, labels, weights) of the distinct cases of Testing.csv.
+
+    Without NumPy the CSV is read row by row, every row with weight 1.
+    """
+    path = dp.get_dataset_path('Testing.csv')
+    if not dp.numpy_available():
+        symptom_lists, labels = read_labeled_cases(path)
+        return symptom_lists, labels, [1] * len(labels)
+    data = dp.load_training_data(path)
+    return data.symptom_lists(), data.label_names(), data.weights.tolist()
+
+
+def ranked_diseases(result):
+    """Diseases of an engine result, best first"""
+    ranked = [result.get('disease')]
+    ranked.extend(entry.get('disease') for entry in result.get('differential', ()))
+    return [disease for disease in dict.fromkeys(ranked) if disease]
+
+
+def score_rankings(rankings, labels, top_k, weights=None):
+    """Accuracy, top-k accuracy and confusion summary of ranked predictions.
+
+    weights counts each ranking as that many cases (default 1).
+    """
+    weights = [1] * len(labels) if weights is None else weights
+    correct = 0
+    correct_top_k = 0
+    mistakes = {}
+    support = {}
+    hits = {}
+    for ranked, label, weight in zip(rankings, labels, weights):
+        predicted = ranked[0] if ranked else None
+        support[label] = support.get(label, 0) + weight
+        if predicted == label:
+            correct += weight
+            hits[label] = hits.get(label, 0) + weight
+        else:
+            pair = (label, predicted)
+            mistakes[pair] = mistakes.get(pair, 0) + weight
+        if label in ranked[:top_k]:
+            correct_top_k += weight
+
+    total = sum(weights)
+    recall = sorted(
+        ((hits.get(label, 0) / count, label, count) for label, count in support.items()),
+        key=lambda item: (item[0], item[1])
+    )
+    return {
+        "rows": total,
+        "accuracy": correct / total if total else None,
+        f"top_{top_k}_accuracy": correct_top_k / total if total else None,
+        "confusion": {
+            "errors": total - correct,
+            "most_confused": [
+                {"true": label, "predicted": predicted, "count": count}
+                for (label, predicted), count in sorted(
+                    mistakes.items(), key=lambda item: (-item[1], item[0][0], str(item[0][1]))
+                )[:CONFUSION_SUMMARY_SIZE]
+            ],
+            "lowest_recall": [
+                {"disease": label, "recall": value, "support": count}
+                for value, label, count in recall[:CONFUSION_SUMMARY_SIZE] if value < 1
+            ]
+        }
+    }
+
+
+def evaluate_engine(engine, symptom_lists, labels, weights, top_k, n_jobs, latency_rows):
+    """Accuracy of one engine on labeled cases, with its latency and throughput"""
+    start = time.perf_counter()
+    results = dp.predict_batch_parallel(symptom_lists, top_k=top_k, engine=engine, n_jobs=n_jobs)
+    elapsed = time.perf_counter() - start
+    report = score_rankings([ranked_diseases(result) for result in results], labels, top_k, weights)
+    report["distinct_rows"] = len(symptom_lists)
+
+    batch = dp.BATCH_ENGINES[engine]
+    batch(symptom_lists[:1], top_k)  # first call builds lazy indexes
+    latencies = []
+    for symptoms in symptom_lists[:latency_rows]:
+        start_row = time.perf_counter()
+        batch([symptoms], top_k)
+        latencies.append((time.perf_counter() - start_row) * 1000)
+
+    latency = percentiles(latencies)
+    report["latency_ms"] = latency
+    report["throughput"] = {
+        "jobs": min(dp.effective_jobs(n_jobs), len(symptom_lists)),
+        "seconds": elapsed,
+        "rows_per_sec": len(symptom_lists) / elapsed if elapsed else None
+    }
+    accuracy = report["accuracy"]
+    report["accuracy_per_ms"] = accuracy / latency["mean"] if accuracy is not None and latency["mean"] else None
+    return report
+
+
+def check_encoding(engine, symptom_lists, top_k):
+    """How many results of an engine were encoded with a spliced-in enrichment, and how many differ from json.dumps"""
+    enrichment = dp.KB.enrichment
+    report = {"results": 0, "spliced": 0, "mismatches": 0}
+    for k in (None, top_k):
+        for result in dp.BATCH_ENGINES[engine](symptom_lists, k):
+            report["results"] += 1
+            if enrichment.split(result)[1] is not None:
+                report["spliced"] += 1
+            if (enrichment.dumps_result(result) != json.dumps(result)
+                    or enrichment.dumps_result(result, 'compact') != json.dumps(result, separators=(',', ':'))):
+                report["mismatches"] += 1
+    if report["mismatches"]:
+        print(f"[{engine}] {report['mismatches']} results encode differently from json.dumps", file=sys.stderr)
+    return report
+
+
+def stratified_folds(labels, folds, seed):
+    """Fold number of every row; each disease's rows are shuffled and dealt round-robin"""
+    rng = random.Random(seed)
+    rows_by_label = {}
+    for row, label in enumerate(labels):
+        rows_by_label.setdefault(label, []).append(row)
+    assignment = [0] * len(labels)
+    offset = 0
+    for label in sorted(rows_by_label):
+        rows = rows_by_label[label]
+        rng.shuffle(rows)
+        for position, row in enumerate(rows):
+            assignment[row] = (offset + position) % folds
+        # Continue the deal where the last disease stopped so folds stay balanced
+        offset += len(rows)
+    return assignment
+
+
+def _fit_fold_model(engine, X_train, y_train, weights, n_jobs):
+    if engine == 'predict':
+        from flat_forest import FlatForest
+        return FlatForest.from_sklearn(dp.fit_forest(X_train, y_train, weights, n_jobs=n_jobs))
+    from naive_bayes import BernoulliNaiveBayes
+    return BernoulliNaiveBayes(alpha=dp.NAIVE_BAYES_PARAMS["alpha"]).fit(X_train, y_train, sample_weight=weights)
+
+
+def cross_validate(engines, folds, top_k, n_jobs, seed):
+    """K-fold accuracy of each engine on the distinct cases of Training.csv"""
+    np = dp.np
+    data = dp.load_training_data()
+    X = data.matrix()
+    labels = data.label_names()
+    weights = data.weights
+    symptom_lists = data.symptom_lists()
+    assignment = np.array(stratified_folds(labels, folds, seed))
+    y = np.array(labels)
+
+    report = {}
+    for engine in engines:
+        trained = engine in TRAINABLE_ENGINES
+        if engine == 'predict' and not (dp.numpy_available() and dp.sklearn_available()):
+            report[engine] = {"skipped": "scikit-learn is not installed"}
+            continue
+
+        print(f"[{engine}] {folds}-fold cross-validation", file=sys.stderr)
+        rankings = [None] * len(labels)
+        for fold in range(folds):
+            held_out = np.flatnonzero(assignment == fold)
+            if trained:
+                train = assignment != fold
+                model = _fit_fold_model(engine, X[train], y[train], weights[train], n_jobs)
+                probabilities = model.predict_proba(X[held_out])
+                classes = model.classes_
+                for row, ranked in zip(held_out, np.argsort(-probabilities, axis=1, kind='stable')[:, :top_k]):
+                    rankings[row] = [classes[idx] for idx in ranked]
+            else:
+                results = dp.predict_batch_parallel(
+                    [symptom_lists[row] for row in held_out], top_k=top_k, engine=engine, n_jobs=n_jobs
+                )
+                for row, result in zip(held_out, results):
+                    rankings[row] = ranked_diseases(result)
+
+        report[engine] = score_rankings(rankings, labels, top_k, weights.tolist())
+        report[engine]["trained_per_fold"] = trained
+    return report
+
+
+def _cell(value, width, precision):
+    """Right-aligned number, or - when it was not measured"""
+    return f"{'-':>{width}}" if value is None else f"{value:>{width}.{precision}f}"
+
+
+def format_summary(engines_report, top_k):
+    """Side-by-side text table of the held-out results"""
+    lines = [f"{'engine':<20}{'accuracy':>10}{f'top-{top_k}':>10}{'p50 ms':>10}{'p99 ms':>10}{'rows/s':>12}{'acc/ms':>10}"]
+    for engine, report in engines_report.items():
+        if "skipped" in report:
+            lines.append(f"{engine:<20}  skipped: {report['skipped']}")
+            continue
+        lines.append(
+            f"{engine:<20}{_cell(report['accuracy'], 10, 3)}{_cell(report[f'top_{top_k}_accuracy'], 10, 3)}"
+            f"{_cell(report['latency_ms']['p50'], 10, 3)}{_cell(report['latency_ms']['p99'], 10, 3)}"
+            f"{_cell(report['throughput']['rows_per_sec'], 12, 0)}{_cell(report['accuracy_per_ms'], 10, 2)}"
+        )
+    return "\n".join(lines)
+
+
+def main(args):
+    def option(name, default):
+        if name in args:
+            return args[args.index(name) + 1]
+        return default
+
+    engines = option('--engines', ','.join(ENGINES)).split(',')
+    unknown = [engine for engine in engines if engine not in dp.BATCH_ENGINES]
+    if unknown:
+        raise SystemExit(f"Unknown engines: {', '.join(unknown)}")
+    top_k = int(option('--top-k', 3))
+    folds = int(option('--folds', 0))
+    jobs = option('--jobs', None)
+    n_jobs = int(jobs) if jobs is not None else None
+    latency_rows = int(option('--latency-rows', 200))
+    seed = int(option('--seed', 42))
+    output = option('--output', None)
+
+    # Measure the engines themselves, not the result cache
+    dp.configure_result_cache(maxsize=0)
+
+    symptom_lists, labels, weights = read_held_out_cases()
+    held_out = {}
+    for engine in engines:
+        if engine == 'predict' and not dp.ml_available():
+            held_out[engine] = {"skipped": "scikit-learn is not installed and no model is cached"}
+            continue
+        if engine == 'naive_bayes' and not dp.numpy_available():
+            held_out[engine] = {"skipped": "NumPy is not installed"}
+            continue
+        print(f"[{engine}] scoring {len(symptom_lists)} distinct held-out rows", file=sys.stderr)
+        held_out[engine] = evaluate_engine(engine, symptom_lists, labels, weights, top_k, n_jobs, latency_rows)
+        held_out[engine]["encoding"] = check_encoding(engine, symptom_lists, top_k)
+
+    result = {
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "top_k": top_k,
+        "held_out": held_out
+    }
+    if folds > 1:
+        if not dp.numpy_available():
+            result["cross_validation"] = {"skipped": "NumPy is not installed"}
+        else:
+            result["cross_validation"] = {
+                "folds": folds,
+                "seed": seed,
+                "engines": cross_validate(engines, folds, top_k, n_jobs, seed)
+            }
+
+    print(format_summary(held_out, top_k), file=sys.stderr)
+    report = json.dumps(result, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(report + '\n')
+        print(f"Wrote evaluation results to {output}", file=sys.stderr)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
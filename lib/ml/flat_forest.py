@@ -0,0 +1,183 @@
+"""Flattened, array-backed form of a fitted random forest.
+
+All trees are concatenated into a handful of contiguous arrays:
+
+- feature: the symptom column a node splits on
+- left, right: absolute indices of the children (unused for leaves)
+- leaf: row of a leaf in leaf_values, -1 for split nodes
+- leaf_values: class distribution of every leaf, normalized to sum to 1
+
+Inputs are one-hot symptoms and every split threshold lies between 0 and 1,
+so a node sends an input right exactly when its feature is present. The
+single-input traversal therefore tests set membership instead of comparing
+floats, and the batch traversal advances every (row, tree) pair that has
+not reached a leaf one level per step with NumPy gathers. Only leaves keep
+class distributions, which makes the flat form less than half the size of
+the sklearn estimator.
+"""
+from array import array
+
+import numpy as np
+
+
+class FlatForest:
+    """Random forest classifier exported to flat arrays"""
+
+    def __init__(self, classes, roots, feature, left, right, leaf, leaf_values):
+        self.classes_ = classes
+        self.roots = roots
+        self.feature = feature
+        self.left = left
+        self.right = right
+        self.leaf = leaf
+        self.leaf_values = leaf_values
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Export a fitted sklearn RandomForestClassifier (single output)"""
+        roots = []
+        feature = []
+        left = []
+        right = []
+        leaf = []
+        leaf_values = []
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            offset = len(feature)
+            roots.append(offset)
+            values = tree.value[:, 0, :]
+            for node in range(tree.node_count):
+                if tree.children_left[node] == -1:
+                    feature.append(0)
+                    left.append(-1)
+                    right.append(-1)
+                    leaf.append(len(leaf_values))
+                    leaf_values.append(values[node] / values[node].sum())
+                else:
+                    # Binary inputs: x <= threshold (0 < threshold < 1) means the symptom is absent
+                    feature.append(int(tree.feature[node]))
+                    left.append(offset + int(tree.children_left[node]))
+                    right.append(offset + int(tree.children_right[node]))
+                    leaf.append(-1)
+        return cls(
+            classes=list(model.classes_),
+            roots=array('i', roots),
+            feature=array('i', feature),
+            left=array('i', left),
+            right=array('i', right),
+            leaf=array('i', leaf),
+            leaf_values=np.array(leaf_values, dtype=np.float64)
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.roots, self.feature, self.left, self.right, self.leaf)) \
+            + self.leaf_values.nbytes
+
+    def _tree_nodes(self, tree):
+        start = self.roots[tree]
+        end = self.roots[tree + 1] if tree + 1 < self.n_trees else len(self.feature)
+        return start, end
+
+    def replace_trees(self, positions, other):
+        """A new forest with the trees at positions replaced, in order, by the trees of other.
+
+        Classes become the sorted union of both forests' classes, as sklearn
+        would order them; a tree gives zero probability to classes it never saw.
+        """
+        classes = sorted(set(self.classes_) | set(other.classes_))
+        class_index = {label: idx for idx, label in enumerate(classes)}
+        replacements = dict(zip(positions, range(other.n_trees)))
+
+        roots = []
+        parts = []
+        n_nodes = 0
+        n_leaves = 0
+        for tree in range(self.n_trees):
+            source, source_tree = (other, replacements[tree]) if tree in replacements else (self, tree)
+            start, end = source._tree_nodes(source_tree)
+            leaf = np.frombuffer(source.leaf, dtype=np.int32)[start:end]
+            is_leaf = leaf >= 0
+            # Rebase child and leaf indices onto the new arrays
+            shift = n_nodes - start
+            left = np.where(is_leaf, -1, np.frombuffer(source.left, dtype=np.int32)[start:end] + shift)
+            right = np.where(is_leaf, -1, np.frombuffer(source.right, dtype=np.int32)[start:end] + shift)
+            leaf_rows = leaf[is_leaf]
+            new_leaf = np.full(end - start, -1, dtype=np.int32)
+            new_leaf[is_leaf] = np.arange(n_leaves, n_leaves + len(leaf_rows))
+            values = np.zeros((len(leaf_rows), len(classes)))
+            values[:, [class_index[label] for label in source.classes_]] = source.leaf_values[leaf_rows]
+
+            roots.append(n_nodes)
+            parts.append((np.frombuffer(source.feature, dtype=np.int32)[start:end], left, right, new_leaf, values))
+            n_nodes += end - start
+            n_leaves += len(leaf_rows)
+
+        def joined(column):
+            return array('i', np.concatenate([part[column] for part in parts]).astype(np.int32).tobytes())
+
+        return FlatForest(
+            classes=classes,
+            roots=array('i', roots),
+            feature=joined(0),
+            left=joined(1),
+            right=joined(2),
+            leaf=joined(3),
+            leaf_values=np.concatenate([part[4] for part in parts])
+        )
+
+    def leaves_for_columns(self, columns):
+        """leaf_values rows reached by one input, given the set of its present columns"""
+        feature, left, right, leaf = self.feature, self.left, self.right, self.leaf
+        leaves = []
+        for node in self.roots:
+            while leaf[node] < 0:
+                node = right[node] if feature[node] in columns else left[node]
+            leaves.append(leaf[node])
+        return leaves
+
+    def predict_proba_columns(self, column_sets):
+        """Class probabilities for inputs given as sets of present columns"""
+        probabilities = np.empty((len(column_sets), len(self.classes_)))
+        for row, columns in enumerate(column_sets):
+            # Trees are accumulated in order, as sklearn does
+            probabilities[row] = self.leaf_values[self.leaves_for_columns(columns)].sum(axis=0)
+        probabilities /= self.n_trees
+        return probabilities
+
+    def predict_proba(self, X):
+        """Class probabilities for a dense 0/1 matrix, traversing all rows and trees together"""
+        X = np.asarray(X) > 0
+        n_rows, n_features = X.shape
+        feature = np.frombuffer(self.feature, dtype=np.int32).astype(np.intp)
+        # children[2 * node + present] is the next node
+        children = np.stack([
+            np.frombuffer(self.left, dtype=np.int32), np.frombuffer(self.right, dtype=np.int32)
+        ], axis=1).ravel().astype(np.intp)
+        leaf = np.frombuffer(self.leaf, dtype=np.int32)
+        is_split = leaf < 0
+
+        # One entry per (row, tree) pair; pairs drop out once they reach a leaf
+        nodes = np.empty(n_rows * self.n_trees, dtype=np.intp)
+        active = np.arange(n_rows * self.n_trees)
+        current = np.tile(np.frombuffer(self.roots, dtype=np.int32).astype(np.intp), n_rows)
+        offsets = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        present = X.ravel()
+        while active.size:
+            current = children[2 * current + present[offsets + feature[current]]]
+            split = is_split[current]
+            finished = ~split
+            nodes[active[finished]] = current[finished]
+            active, current, offsets = active[split], current[split], offsets[split]
+
+        leaves = leaf[nodes].reshape(n_rows, self.n_trees)
+        probabilities = np.zeros((n_rows, len(self.classes_)))
+        # Trees are accumulated in order, as sklearn does
+        for tree in range(self.n_trees):
+            probabilities += self.leaf_values[leaves[:, tree]]
+        probabilities /= self.n_trees
+        return probabilities
@@ -0,0 +1,184 @@
+"""Named timers and counters for the prediction pipeline.
+
+Timers wrap pipeline stages (CSV loading, training, encoding, inference,
+enrichment) and feed two sinks:
+
+- process-wide aggregates (count, total, min, max per timer and a total per
+  counter), enabled with MEDIMIND_METRICS=1 or enable(), and queryable from
+  a long-running worker via stats()
+- per-request timings, collected only inside collect_timings()
+
+When neither sink is active, timer() returns a shared no-op object, so the
+instrumentation costs a flag check per stage.
+
+Setting MEDIMIND_PROFILE_RATE (0..1) profiles that fraction of the blocks
+wrapped in profiled() with cProfile and dumps each profile to
+MEDIMIND_PROFILE_DIR (a temp directory by default).
+"""
+import contextvars
+import cProfile
+import os
+import random
+import tempfile
+import threading
+import time
+
+_enabled = os.environ.get('MEDIMIND_METRICS', '') not in ('', '0')
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+_profile_rate = float(os.environ.get('MEDIMIND_PROFILE_RATE') or 0)
+_profile_dir = os.environ.get('MEDIMIND_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'medimind-profiles')
+# cProfile can only run one profiler at a time
+_profile_lock = threading.Lock()
+
+
+def enable(flag=True):
+    """Turn process-wide aggregation on or off"""
+    global _enabled
+    _enabled = flag
+
+
+def enabled():
+    return _enabled
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ('name', 'timings', 'start')
+
+    def __init__(self, name, timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        if self.timings is not None:
+            self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed_ms
+        if _enabled:
+            with _lock:
+                stat = _timers.get(self.name)
+                if stat is None:
+                    _timers[self.name] = [1, elapsed_ms, elapsed_ms, elapsed_ms]
+                else:
+                    stat[0] += 1
+                    stat[1] += elapsed_ms
+                    stat[2] = min(stat[2], elapsed_ms)
+                    stat[3] = max(stat[3], elapsed_ms)
+        return False
+
+
+def timer(name):
+    """Context manager timing the named stage"""
+    timings = _request_timings.get()
+    if timings is None and not _enabled:
+        return _NOOP
+    return _Timer(name, timings)
+
+
+def count(name, value=1):
+    """Add value to the named counter"""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+
+class collect_timings:
+    """Collect the stage timings of the enclosed block into .timings (milliseconds).
+
+    With active=False nothing is collected and .timings stays None.
+    """
+
+    def __init__(self, active=True):
+        self.active = active
+        self.timings = None
+
+    def __enter__(self):
+        if self.active:
+            self.timings = {}
+            self._token = _request_timings.set(self.timings)
+        return self
+
+    def __exit__(self, *exc):
+        if self.active:
+            _request_timings.reset(self._token)
+        return False
+
+
+class profiled:
+    """Profile the enclosed block with cProfile for a sampled fraction of calls.
+
+    A block that serves several requests at once passes their number as
+    weight, so it is sampled as often as that many single requests would be.
+    """
+
+    def __init__(self, label, weight=1):
+        self.label = label
+        self.weight = weight
+        self.profile = None
+
+    def __enter__(self):
+        if (_profile_rate > 0 and random.random() < _profile_rate * self.weight
+                and _profile_lock.acquire(blocking=False)):
+            self.profile = cProfile.Profile()
+            try:
+                self.profile.enable()
+            except ValueError:
+                # Another profiler is already active in this process
+                self.profile = None
+                _profile_lock.release()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile is None:
+            return False
+        try:
+            self.profile.disable()
+            os.makedirs(_profile_dir, exist_ok=True)
+            filename = f"{self.label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}.prof"
+            self.profile.dump_stats(os.path.join(_profile_dir, filename))
+        finally:
+            self.profile = None
+            _profile_lock.release()
+        return False
+
+
+def stats():
+    """Aggregated timers (milliseconds) and counters since start or the last reset()"""
+    with _lock:
+        return {
+            "enabled": _enabled,
+            "timers": {
+                name: {
+                    "count": stat[0],
+                    "total_ms": stat[1],
+                    "mean_ms": stat[1] / stat[0],
+                    "min_ms": stat[2],
+                    "max_ms": stat[3]
+                }
+                for name, stat in _timers.items()
+            },
+            "counters": dict(_counters)
+        }
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
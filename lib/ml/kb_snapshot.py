@@ -0,0 +1,250 @@
+"""Compiled binary snapshot of the disease knowledge base.
+
+The four knowledge base CSVs (dataset, descriptions, precautions, severity)
+are compiled into one file that is memory-mapped read-only. Loading a table
+decodes its integer sections into the same dicts and lists the CSV parsers
+return, which is several times faster than parsing the CSVs at startup.
+Only the mapped file is shared between processes: the decoded tables, like
+the indexes built from them, are private to each process.
+
+Layout: an 8 byte magic, a little-endian uint32 header length, a JSON header
+and then 8-byte aligned sections. All strings live in one string table
+(uint32 offsets into a UTF-8 blob). Symptoms come first in that table so
+their string ids are dense symptom ids (0..n_symptoms-1), followed by the
+diseases of the disease map. Every other section is a uint32/int32 array
+referring to those ids.
+"""
+import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b'MMKBSNP1'
+FORMAT_VERSION = 1
+
+
+def file_sha256(file_path):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_stamp(file_path):
+    """Identity of a source file: size and mtime for a cheap check, sha256 as the authority"""
+    if not os.path.exists(file_path):
+        return None
+    stat = os.stat(file_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(file_path)
+    }
+
+
+def is_source_fresh(stamp, file_path):
+    """Whether file_path still has the content recorded in stamp.
+
+    A matching size and mtime is trusted without hashing; otherwise the
+    content hash decides, so a touched but unchanged file stays fresh.
+    """
+    if stamp is None or not os.path.exists(file_path):
+        return stamp is None and not os.path.exists(file_path)
+    stat = os.stat(file_path)
+    if stat.st_size != stamp["size"]:
+        return False
+    if stat.st_mtime_ns == stamp["mtime_ns"]:
+        return True
+    return file_sha256(file_path) == stamp["sha256"]
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+
+def _u32(values):
+    return array.array('I', values)
+
+
+def build_snapshot(snapshot_path, disease_symptom_map, all_symptoms, descriptions,
+                   precautions, severity, sources):
+    """Write a snapshot of the given tables to snapshot_path.
+
+    sources maps each source name to its file path; their stamps are stored
+    so readers can tell whether a table in the snapshot is stale.
+    """
+    strings = _StringTable()
+    # Symptoms first so symptom ids are dense, then diseases of the map
+    for symptom in all_symptoms:
+        strings.add(symptom)
+    for symptoms in disease_symptom_map.values():
+        for symptom in symptoms:
+            strings.add(symptom)
+    for symptom in severity:
+        strings.add(symptom)
+    n_symptoms = len(strings.strings)
+    for disease in disease_symptom_map:
+        strings.add(disease)
+
+    indptr = [0]
+    indices = []
+    for symptoms in disease_symptom_map.values():
+        indices.extend(strings.add(symptom) for symptom in symptoms)
+        indptr.append(len(indices))
+
+    precaution_indptr = [0]
+    precaution_values = []
+    for values in precautions.values():
+        precaution_values.extend(strings.add(value) for value in values)
+        precaution_indptr.append(len(precaution_values))
+
+    sections = {
+        "all_symptoms": _u32(strings.add(symptom) for symptom in all_symptoms),
+        "map_diseases": _u32(strings.add(disease) for disease in disease_symptom_map),
+        "map_indptr": _u32(indptr),
+        "map_indices": _u32(indices),
+        "severity_keys": _u32(strings.add(symptom) for symptom in severity),
+        "severity_values": array.array('i', severity.values()),
+        "description_keys": _u32(strings.add(disease) for disease in descriptions),
+        "description_values": _u32(strings.add(text) for text in descriptions.values()),
+        "precaution_keys": _u32(strings.add(disease) for disease in precautions),
+        "precaution_indptr": _u32(precaution_indptr),
+        "precaution_values": _u32(precaution_values),
+    }
+
+    blob = bytearray()
+    offsets = [0]
+    for value in strings.strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    sections["string_offsets"] = _u32(offsets)
+    sections["string_blob"] = bytes(blob)
+
+    # Offsets in the header are relative to the start of the data area
+    layout = {}
+    payload = bytearray()
+    for name, data in sections.items():
+        payload += b'\0' * (-len(payload) % 8)
+        raw = data.tobytes() if isinstance(data, array.array) else data
+        typecode = data.typecode if isinstance(data, array.array) else 'B'
+        layout[name] = [len(payload), len(raw), typecode]
+        payload += raw
+
+    header = json.dumps({
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "n_symptoms": n_symptoms,
+        "n_diseases": len(disease_symptom_map),
+        "sources": {name: source_stamp(path) for name, path in sources.items()},
+        "sections": layout
+    }).encode('utf-8')
+
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    prefix += b'\0' * (-len(prefix) % 8)
+
+    os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(prefix)
+        f.write(payload)
+    os.replace(tmp_path, snapshot_path)
+
+
+class KnowledgeBaseSnapshot:
+    """Read-only, memory-mapped view of a snapshot file"""
+
+    def __init__(self, snapshot_path):
+        self.path = snapshot_path
+        with open(snapshot_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{snapshot_path} is not a knowledge base snapshot")
+        (header_len,) = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        self.header = json.loads(self._mmap[header_start:header_start + header_len].decode('utf-8'))
+        if self.header.get("format") != FORMAT_VERSION or self.header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{snapshot_path} was written in an incompatible format")
+
+        data_start = header_start + header_len
+        data_start += -data_start % 8
+        view = self._view = memoryview(self._mmap)
+        self._sections = {}
+        for name, (offset, length, typecode) in self.header["sections"].items():
+            section = view[data_start + offset:data_start + offset + length]
+            self._sections[name] = section if typecode == 'B' else section.cast(typecode)
+
+        self.n_symptoms = self.header["n_symptoms"]
+        self.n_diseases = self.header["n_diseases"]
+
+    @property
+    def sources(self):
+        return self.header["sources"]
+
+    def is_fresh(self, name, file_path):
+        """Whether the table compiled from source name is still current"""
+        return name in self.sources and is_source_fresh(self.sources[name], file_path)
+
+    def section(self, name):
+        """Raw memory-mapped array of a section (e.g. map_indptr, map_indices)"""
+        return self._sections[name]
+
+    def string(self, string_id):
+        offsets = self._sections["string_offsets"]
+        return bytes(self._sections["string_blob"][offsets[string_id]:offsets[string_id + 1]]).decode('utf-8')
+
+    def _strings(self, name):
+        return [self.string(string_id) for string_id in self._sections[name]]
+
+    def symptom_names(self):
+        """Names of symptom ids 0..n_symptoms-1"""
+        return [self.string(symptom_id) for symptom_id in range(self.n_symptoms)]
+
+    # The table accessors decode a new copy of their table on every call
+
+    def dataset(self):
+        """(disease_symptom_map, all_symptoms) as returned by parse_dataset_csv"""
+        names = self.symptom_names()
+        indptr = self._sections["map_indptr"]
+        indices = self._sections["map_indices"]
+        disease_symptom_map = {}
+        for row, disease in enumerate(self._strings("map_diseases")):
+            disease_symptom_map[disease] = [names[idx] for idx in indices[indptr[row]:indptr[row + 1]]]
+        all_symptoms = [names[idx] for idx in self._sections["all_symptoms"]]
+        return disease_symptom_map, all_symptoms
+
+    def severity(self):
+        return dict(zip(self._strings("severity_keys"), self._sections["severity_values"]))
+
+    def descriptions(self):
+        return dict(zip(self._strings("description_keys"), self._strings("description_values")))
+
+    def precautions(self):
+        values = self._strings("precaution_values")
+        indptr = self._sections["precaution_indptr"]
+        return {
+            disease: values[indptr[row]:indptr[row + 1]]
+            for row, disease in enumerate(self._strings("precaution_keys"))
+        }
+
+    def close(self):
+        for section in self._sections.values():
+            section.release()
+        self._sections = {}
+        self._view.release()
+        self._mmap.close()
@@ -0,0 +1,139 @@
+"""Micro-batching of concurrent requests for the asyncio server.
+
+Single-row inference leaves the vectorized batch paths of the engines
+mostly idle. MicroBatcher queues the single-row requests of all connections
+and hands them to the engine together:
+
+- a collector task takes the oldest queued request and everything queued
+  behind it, up to max_batch_size, and when a burst is under way keeps
+  collecting for up to window seconds
+- the batch runs on an executor thread; requests that arrive meanwhile
+  queue up and form the next batch, so batches grow with the load. One
+  batch at a time (max_in_flight=1) gives the largest batches; the other
+  executor threads stay free for requests that are not batched
+- the queue is bounded, so a burst that outpaces the engine makes
+  enqueue() wait instead of growing the backlog without limit
+- when a batch call raises, its items are run again one at a time, so a
+  request that fails does not fail the others batched with it
+
+A lone request at low load is dispatched as soon as a batch slot is free,
+without waiting for the window, so batching does not add latency when
+there is nothing to batch with.
+"""
+import asyncio
+
+import instrumentation
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into calls of run_batch.
+
+    run_batch(key, items) runs on executor and returns one result per item,
+    in order. Only items queued with the same key share a batch.
+    """
+
+    def __init__(self, run_batch, executor, max_batch_size=64, window=0.002, max_queue=1024, max_in_flight=1):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._queue = asyncio.Queue(max_queue)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._collector = None
+        self._batches = set()
+
+    def start(self):
+        self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self):
+        """Stop collecting and wait for the batches that are running"""
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        if self._batches:
+            await asyncio.gather(*self._batches)
+
+    async def enqueue(self, key, item):
+        """Queue an item, waiting while the queue is full, and return the future of its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, item, future))
+        return future
+
+    async def submit(self, key, item):
+        return await (await self.enqueue(key, item))
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            # Requests keep queueing while every batch slot is busy
+            await self._slots.acquire()
+            batch = [first]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # More than one request waiting means a burst: give it the window to fill the batch
+            if len(batch) > 1 and self.window > 0:
+                deadline = loop.time() + self.window
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+            task = loop.create_task(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            groups = {}
+            for key, item, future in batch:
+                groups.setdefault(key, []).append((item, future))
+            instrumentation.count('micro_batch.batches', len(groups))
+            instrumentation.count('micro_batch.rows', len(batch))
+
+            for key, entries in groups.items():
+                try:
+                    results = await loop.run_in_executor(
+                        self.executor, self.run_batch, key, [item for item, _ in entries]
+                    )
+                except Exception as e:
+                    if len(entries) == 1:
+                        self._resolve(entries, exception=e)
+                    else:
+                        # Retry the items one by one so only the failing ones get the error
+                        instrumentation.count('micro_batch.retries')
+                        for entry in entries:
+                            await self._run_alone(loop, key, entry)
+                    continue
+                self._resolve(entries, results)
+        finally:
+            self._slots.release()
+
+    async def _run_alone(self, loop, key, entry):
+        try:
+            results = await loop.run_in_executor(self.executor, self.run_batch, key, [entry[0]])
+        except Exception as e:
+            self._resolve([entry], exception=e)
+        else:
+            self._resolve([entry], results)
+
+    @staticmethod
+    def _resolve(entries, results=None, exception=None):
+        for idx, (_, future) in enumerate(entries):
+            # The caller may have given up on its request
+            if future.done():
+                continue
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(results[idx])
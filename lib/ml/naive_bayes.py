@@ -0,0 +1,82 @@
+"""Bernoulli Naive Bayes over one-hot symptom vectors, using only NumPy.
+
+Fitting precomputes per-class log-probabilities, so scoring a batch is one
+matrix product plus a per-class offset:
+
+    log P(c | x) = log P(c) + sum_j log(1 - p_cj) + sum_j x_j * (log p_cj - log(1 - p_cj)) + const
+
+where p_cj is the Laplace-smoothed probability that a case of class c
+has symptom j.
+"""
+import numpy as np
+
+
+class BernoulliNaiveBayes:
+    """Bernoulli Naive Bayes classifier with additive (Laplace) smoothing.
+
+    The (weighted) class and class-symptom counts are kept, so partial_fit
+    can fold in new cases and give exactly the model a fit on all the data
+    would.
+    """
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.classes_ = None
+        # (n_classes,) and (n_classes, n_features): weighted case and symptom counts
+        self.class_counts_ = None
+        self.feature_counts_ = None
+        # (n_features, n_classes): log p - log(1 - p), multiplied by the input
+        self.feature_weights = None
+        # (n_classes,): log prior + sum of log(1 - p), the score of an empty input
+        self.class_offsets = None
+
+    def fit(self, X, y, sample_weight=None):
+        self.classes_ = None
+        return self.partial_fit(X, y, sample_weight)
+
+    def partial_fit(self, X, y, sample_weight=None):
+        """Add cases to the counts; labels not seen before become new classes"""
+        X = np.asarray(X, dtype=np.float64)
+        labels = [str(label) for label in np.asarray(y)]
+        weights = np.ones(len(labels)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+
+        if self.classes_ is None:
+            self.classes_ = []
+            self.class_counts_ = np.zeros(0)
+            self.feature_counts_ = np.zeros((0, X.shape[1]))
+        # Classes stay sorted, as a fit on all the data would order them
+        classes = sorted(set(self.classes_).union(labels))
+        if classes != self.classes_:
+            rows = [classes.index(label) for label in self.classes_]
+            class_counts = np.zeros(len(classes))
+            class_counts[rows] = self.class_counts_
+            feature_counts = np.zeros((len(classes), self.feature_counts_.shape[1]))
+            feature_counts[rows] = self.feature_counts_
+            self.classes_, self.class_counts_, self.feature_counts_ = classes, class_counts, feature_counts
+        class_index = {label: idx for idx, label in enumerate(classes)}
+        y_idx = np.array([class_index[label] for label in labels], dtype=np.intp)
+
+        # Weighted one-hot of the labels: (n_samples, n_classes)
+        membership = np.zeros((len(y_idx), len(classes)))
+        membership[np.arange(len(y_idx)), y_idx] = weights
+        self.class_counts_ = self.class_counts_ + membership.sum(axis=0)
+        self.feature_counts_ = self.feature_counts_ + membership.T @ (X > 0)
+        self._update_weights()
+        return self
+
+    def _update_weights(self):
+        prob = (self.feature_counts_ + self.alpha) / (self.class_counts_[:, None] + 2 * self.alpha)
+        log_prob = np.log(prob)
+        log_neg_prob = np.log1p(-prob)
+        self.feature_weights = np.ascontiguousarray((log_prob - log_neg_prob).T)
+        self.class_offsets = np.log(self.class_counts_ / self.class_counts_.sum()) + log_neg_prob.sum(axis=1)
+
+    def joint_log_likelihood(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.feature_weights + self.class_offsets
+
+    def predict_proba(self, X):
+        scores = self.joint_log_likelihood(X)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
@@ -0,0 +1,158 @@
+import path from 'path';
+import readline from 'readline';
+import { exec, spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import { promisify } from 'util';
+
+const execPromise = promisify(exec);
+// Try different Python executable names in order
+const pythonExecutables = ['python3', 'python', 'py'];
+const REQUEST_TIMEOUT_MS = 30000;
+// The worker writes "id" first and "result" last, so a line starting like this
+// holds nothing but the id and the JSON text of the result
+const RESULT_LINE_PREFIX = /^\{"id": (\d+), "result": /;
+
+interface PendingRequest {
+  resolve: (value: any) => void;
+  reject: (reason: Error) => void;
+  timer: NodeJS.Timeout;
+  // Resolve with the result's JSON text instead of the parsed value
+  raw: boolean;
+}
+
+interface WorkerState {
+  process: ChildProcessWithoutNullStreams | null;
+  starting: Promise<ChildProcessWithoutNullStreams> | null;
+  nextId: number;
+  pending: Map<number, PendingRequest>;
+}
+
+// Keep the worker on globalThis so dev-mode module reloads reuse the same process
+const globalForWorker = globalThis as unknown as { predictorWorker?: WorkerState };
+const state: WorkerState = globalForWorker.predictorWorker ?? {
+  process: null,
+  starting: null,
+  nextId: 1,
+  pending: new Map(),
+};
+globalForWorker.predictorWorker = state;
+
+export async function findPythonExecutable(): Promise<string> {
+  for (const pythonExec of pythonExecutables) {
+    try {
+      await execPromise(`${pythonExec} --version`);
+      return pythonExec;
+    } catch (error) {
+      continue;
+    }
+  }
+  return 'python3'; // Default to python3 if no executable found
+}
+
+function failPending(error: Error) {
+  state.pending.forEach(({ reject, timer }) => {
+    clearTimeout(timer);
+    reject(error);
+  });
+  state.pending.clear();
+}
+
+async function startWorker(): Promise<ChildProcessWithoutNullStreams> {
+  const pythonExec = await findPythonExecutable();
+  const script = path.join(process.cwd(), 'lib/ml/disease_predictor.py');
+  console.log(`Starting predictor worker: ${pythonExec} ${script} --serve --eager --watch --micro-batch`);
+
+  // --watch reloads the knowledge base when the dataset files are edited;
+  // --micro-batch scores concurrent predict requests together
+  const child = spawn(pythonExec, [script, '--serve', '--eager', '--watch', '--micro-batch'], { cwd: process.cwd() });
+
+  readline.createInterface({ input: child.stdout }).on('line', (line) => {
+    const prefix = RESULT_LINE_PREFIX.exec(line);
+    if (prefix) {
+      const id = Number(prefix[1]);
+      const request = state.pending.get(id);
+      if (request?.raw) {
+        state.pending.delete(id);
+        clearTimeout(request.timer);
+        request.resolve(line.slice(prefix[0].length, -1));
+        return;
+      }
+    }
+
+    let response: { id?: number; result?: unknown; error?: string };
+    try {
+      response = JSON.parse(line);
+    } catch (e) {
+      console.error(`Unparseable predictor output: ${line}`);
+      return;
+    }
+    const request = response.id === undefined ? undefined : state.pending.get(response.id);
+    if (!request) {
+      return;
+    }
+    state.pending.delete(response.id as number);
+    clearTimeout(request.timer);
+    if (response.error) {
+      request.reject(new Error(response.error));
+    } else {
+      request.resolve(response.result);
+    }
+  });
+
+  readline.createInterface({ input: child.stderr }).on('line', (line) => {
+    console.error(`Python stderr: ${line}`);
+  });
+
+  const onExit = (reason: string) => {
+    if (state.process === child) {
+      state.process = null;
+    }
+    failPending(new Error(reason));
+  };
+  child.on('error', (error) => onExit(`Predictor worker error: ${error.message}`));
+  child.on('exit', (code) => onExit(`Predictor worker exited with code ${code}`));
+
+  return child;
+}
+
+async function getWorker(): Promise<ChildProcessWithoutNullStreams> {
+  if (state.process) {
+    return state.process;
+  }
+  if (!state.starting) {
+    state.starting = startWorker()
+      .then((child) => {
+        state.process = child;
+        return child;
+      })
+      .finally(() => {
+        state.starting = null;
+      });
+  }
+  return state.starting;
+}
+
+async function sendRequest<T>(op: string, payload: Record<string, unknown>, raw: boolean): Promise<T> {
+  const worker = await getWorker();
+  const id = state.nextId++;
+
+  return new Promise<T>((resolve, reject) => {
+    const timer = setTimeout(() => {
+      state.pending.delete(id);
+      reject(new Error(`Predictor request ${id} timed out`));
+    }, REQUEST_TIMEOUT_MS);
+
+    state.pending.set(id, { resolve, reject, timer, raw });
+    worker.stdin.write(JSON.stringify({ id, op, ...payload }) + '\n');
+  });
+}
+
+// Send one request to the resident Python worker and wait for its response
+export async function callPredictor<T>(op: string, payload: Record<string, unknown> = {}): Promise<T> {
+  return sendRequest<T>(op, payload, false);
+}
+
+// Like callPredictor, but resolves with the result as the JSON text the worker
+// wrote, for responses that are passed on to the client unchanged
+export async function callPredictorRaw(op: string, payload: Record<string, unknown> = {}): Promise<string> {
+  return sendRequest<string>(op, payload, true);
+}
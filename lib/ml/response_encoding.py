@@ -0,0 +1,186 @@
+"""Pre-rendered disease enrichment and fast JSON encoding of results.
+
+Every result carries the description and precautions of its disease, the
+same text for every result of that disease. EnrichmentTable renders them
+to JSON fragments once per knowledge base version; encoding a result then
+runs json over the rest of it and splices the fragment in, instead of
+escaping the same text again for every result.
+
+A fragment is only spliced in when the result's description and
+precautions equal the table's and are its last keys, where the fragment
+goes (add_disease_details adds them last); any other result (a fallback
+description, a knowledge base version with other text, keys added after
+the enrichment) is encoded in full. The output is therefore always the
+same as json.dumps.
+
+Batch results can be written in three formats:
+
+- jsonl: one result per line, as the server sends them
+- compact: the same without whitespace
+- binary: the enrichment of every disease once, in the header, followed by
+  length-prefixed compact results that refer to it by index (see
+  read_binary_results)
+"""
+import json
+import struct
+
+ENRICHMENT_KEYS = ('description', 'precautions')
+
+# json.dumps builds a new encoder for any non-default option; these are built once
+_ENCODERS = {
+    'jsonl': json.JSONEncoder().encode,
+    'compact': json.JSONEncoder(separators=(',', ':')).encode,
+}
+_ITEM_SEPARATORS = {'jsonl': ', ', 'compact': ','}
+_KEY_SEPARATORS = {'jsonl': ': ', 'compact': ':'}
+
+BATCH_FORMATS = ('jsonl', 'compact', 'binary')
+
+BINARY_MAGIC = b'MMRSLTS1'
+BINARY_FORMAT_VERSION = 1
+_RECORD = struct.Struct('<II')
+
+# Lines joined per write of a text batch output
+WRITE_CHUNK = 1024
+
+
+class EnrichmentTable:
+    """Descriptions and precautions of every disease, pre-rendered as JSON fragments"""
+
+    def __init__(self, descriptions, precautions):
+        self.descriptions = descriptions
+        self.precautions = precautions
+        self.diseases = list(dict.fromkeys([*descriptions, *precautions]))
+        self.index = {disease: idx for idx, disease in enumerate(self.diseases)}
+        self.fragments = {style: [self._render(disease, style) for disease in self.diseases] for style in _ENCODERS}
+
+    def _render(self, disease, style):
+        encode = _ENCODERS[style]
+        parts = []
+        if disease in self.descriptions:
+            parts.append('"description"' + _KEY_SEPARATORS[style] + encode(self.descriptions[disease]))
+        if disease in self.precautions:
+            parts.append('"precautions"' + _KEY_SEPARATORS[style] + encode(self.precautions[disease]))
+        return _ITEM_SEPARATORS[style].join(parts)
+
+    def split(self, result):
+        """(rest, idx): the result without its enrichment and the table row of that enrichment.
+
+        idx is None, and rest the result itself, when the result does not
+        end with exactly the table's enrichment of its disease.
+        """
+        disease = result.get('disease')
+        idx = self.index.get(disease) if isinstance(disease, str) else None
+        if idx is None:
+            return result, None
+        present = []
+        for key, table in zip(ENRICHMENT_KEYS, (self.descriptions, self.precautions)):
+            if (key in result) != (disease in table) or (key in result and result[key] != table[disease]):
+                return result, None
+            if key in result:
+                present.append(key)
+        # The fragment is appended, so the enrichment has to be where json.dumps would put it
+        if list(result)[-len(present):] != present:
+            return result, None
+        rest = result.copy()
+        for key in ENRICHMENT_KEYS:
+            rest.pop(key, None)
+        return rest, idx
+
+    def dumps_result(self, result, style='jsonl'):
+        """JSON text of one result, with its enrichment spliced in from the table"""
+        encode = _ENCODERS[style]
+        if not isinstance(result, dict):
+            return encode(result)
+        rest, idx = self.split(result)
+        if idx is None:
+            return encode(result)
+        encoded = encode(rest)
+        if encoded == '{}':
+            return '{' + self.fragments[style][idx] + '}'
+        return encoded[:-1] + _ITEM_SEPARATORS[style] + self.fragments[style][idx] + '}'
+
+    def dumps_value(self, value, style='jsonl'):
+        """JSON text of a result or a list of results"""
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            return '[' + _ITEM_SEPARATORS[style].join(self.dumps_result(item, style) for item in value) + ']'
+        return self.dumps_result(value, style)
+
+    def dumps_response(self, response):
+        """JSON text of a server response: "id" first and "result" last.
+
+        With nothing else in the response, the line reads
+        {"id": ..., "result": <result>}, so a client can cut the result text
+        out without parsing it.
+        """
+        encode = _ENCODERS['jsonl']
+        parts = ['"id": ' + encode(response.get('id'))]
+        for key, value in response.items():
+            if key not in ('id', 'result'):
+                parts.append(encode(key) + ': ' + encode(value))
+        if 'result' in response:
+            parts.append('"result": ' + self.dumps_value(response['result']))
+        return '{' + ', '.join(parts) + '}'
+
+    def write_results(self, results, f, output_format='jsonl'):
+        """Write results to f: text for jsonl/compact, bytes for binary"""
+        if output_format == 'binary':
+            self._write_binary(results, f)
+            return
+        if output_format not in _ENCODERS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        lines = []
+        for result in results:
+            lines.append(self.dumps_result(result, output_format))
+            if len(lines) >= WRITE_CHUNK:
+                f.write('\n'.join(lines) + '\n')
+                lines = []
+        if lines:
+            f.write('\n'.join(lines) + '\n')
+
+    def _write_binary(self, results, f):
+        header = json.dumps({
+            "format": BINARY_FORMAT_VERSION,
+            "enrichment": [
+                [disease, self.descriptions.get(disease), self.precautions.get(disease)]
+                for disease in self.diseases
+            ]
+        }, separators=(',', ':')).encode('utf-8')
+        f.write(BINARY_MAGIC + struct.pack('<I', len(header)) + header)
+        encode = _ENCODERS['compact']
+        chunk = []
+        for result in results:
+            rest, idx = self.split(result) if isinstance(result, dict) else (result, None)
+            record = encode(rest).encode('utf-8')
+            # Row 0 means no enrichment; row n refers to table entry n - 1
+            chunk.append(_RECORD.pack(len(record), 0 if idx is None else idx + 1) + record)
+            if len(chunk) >= WRITE_CHUNK:
+                f.write(b''.join(chunk))
+                chunk = []
+        if chunk:
+            f.write(b''.join(chunk))
+
+
+def read_binary_results(f):
+    """Results of a binary batch output (binary file object), with their enrichment restored"""
+    magic = f.read(len(BINARY_MAGIC))
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a binary batch result file")
+    (header_len,) = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(header_len).decode('utf-8'))
+    if header.get("format") != BINARY_FORMAT_VERSION:
+        raise ValueError("Binary batch result file has an incompatible format")
+    enrichment = header["enrichment"]
+    while True:
+        prefix = f.read(_RECORD.size)
+        if not prefix:
+            return
+        length, row = _RECORD.unpack(prefix)
+        result = json.loads(f.read(length).decode('utf-8'))
+        if row:
+            _, description, precautions = enrichment[row - 1]
+            if description is not None:
+                result['description'] = description
+            if precautions is not None:
+                result['precautions'] = precautions
+        yield result
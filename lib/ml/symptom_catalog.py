@@ -0,0 +1,130 @@
+"""Integer-coded symptoms and diseases with bitset symptom sets.
+
+SymptomCatalog interns every symptom and disease of a disease -> symptom
+map to a dense integer id once. A set of symptoms is then a Python int
+used as a bitset (bit i set when symptom i is present), so the engines
+match an input against a disease with one AND and a popcount instead of
+building and intersecting string sets:
+
+- each disease is a DiseaseRecord (__slots__) holding its symptom mask and
+  the totals the engines divide by, precomputed
+- each symptom has a posting mask of the diseases listing it; OR-ing the
+  postings of an input gives its candidate diseases, in map order
+
+Symptom ids can be supplied (the knowledge base uses its vocabulary ids);
+symptoms not covered get the next free ids.
+"""
+
+
+def _popcount_fallback(mask):
+    return bin(mask).count('1')
+
+
+# int.bit_count is Python 3.10+
+popcount = getattr(int, 'bit_count', _popcount_fallback)
+
+
+def iter_bits(mask):
+    """Positions of the set bits of mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DiseaseRecord:
+    """A disease with its symptom bitset and precomputed totals"""
+
+    __slots__ = ('id', 'name', 'symptoms', 'mask', 'symptom_count', 'severity_total', 'clinical_severity_total')
+
+    def __init__(self, disease_id, name, symptoms, mask, symptom_count, severity_total, clinical_severity_total):
+        self.id = disease_id
+        self.name = name
+        # The symptom list as given in the map (shared, not copied)
+        self.symptoms = symptoms
+        self.mask = mask
+        # Totals follow the symptom list as given, including any repeated entries
+        self.symptom_count = symptom_count
+        # Severity sums with missing severities counted as 1 (severity engine) and 3 (clinical relevance)
+        self.severity_total = severity_total
+        self.clinical_severity_total = clinical_severity_total
+
+
+class SymptomCatalog:
+    """Dense integer ids and bitsets for the symptoms and diseases of a disease -> symptom map"""
+
+    def __init__(self, disease_symptom_map, symptom_severity=None, symptom_ids=None, extra_symptoms=()):
+        symptom_severity = symptom_severity or {}
+        self.symptom_ids = dict(symptom_ids or {})
+        self.symptoms = [None] * len(self.symptom_ids)
+        for symptom, symptom_id in self.symptom_ids.items():
+            self.symptoms[symptom_id] = symptom
+
+        def intern(symptom):
+            symptom_id = self.symptom_ids.get(symptom)
+            if symptom_id is None:
+                symptom_id = self.symptom_ids[symptom] = len(self.symptoms)
+                self.symptoms.append(symptom)
+            return symptom_id
+
+        self.records = []
+        self.disease_ids = {}
+        for disease, symptoms in disease_symptom_map.items():
+            mask = 0
+            for symptom in symptoms:
+                mask |= 1 << intern(symptom)
+            self.disease_ids[disease] = len(self.records)
+            self.records.append(DiseaseRecord(
+                len(self.records), disease, symptoms, mask, len(symptoms),
+                sum(symptom_severity.get(s, 1) for s in symptoms),
+                max(1, sum(symptom_severity.get(s, 3) for s in symptoms))
+            ))
+        for symptom in extra_symptoms:
+            intern(symptom)
+
+        self.severity = [symptom_severity.get(symptom) for symptom in self.symptoms]
+        self._weights = {}
+
+        # Symptom id -> bitset of the diseases listing it
+        self.postings = [0] * len(self.symptoms)
+        for record in self.records:
+            for symptom_id in iter_bits(record.mask):
+                self.postings[symptom_id] |= 1 << record.id
+
+    def severity_weights(self, default):
+        """Severity of every symptom id, with default for symptoms without one"""
+        weights = self._weights.get(default)
+        if weights is None:
+            weights = self._weights[default] = [
+                default if severity is None else severity for severity in self.severity
+            ]
+        return weights
+
+    def encode(self, input_symptoms):
+        """(ids, mask) of the known input symptoms; ids are unique, in input order"""
+        symptom_ids = self.symptom_ids
+        ids = [symptom_ids[s] for s in dict.fromkeys(input_symptoms) if s in symptom_ids]
+        mask = 0
+        for symptom_id in ids:
+            mask |= 1 << symptom_id
+        return ids, mask
+
+    def candidate_records(self, ids):
+        """Records of the diseases listing at least one of the symptom ids, in map order"""
+        diseases = 0
+        for symptom_id in ids:
+            diseases |= self.postings[symptom_id]
+        return [self.records[disease_id] for disease_id in iter_bits(diseases)]
+
+    def candidates(self, input_symptoms):
+        """(disease, symptoms) pairs sharing at least one symptom with the input, in map order"""
+        ids, _ = self.encode(input_symptoms)
+        return [(record.name, record.symptoms) for record in self.candidate_records(ids)]
+
+    def matching_symptoms(self, input_symptoms, mask):
+        """Input symptoms (in input order) whose bit is set in mask"""
+        symptom_ids = self.symptom_ids
+        return [
+            symptom for symptom in dict.fromkeys(input_symptoms)
+            if symptom in symptom_ids and mask >> symptom_ids[symptom] & 1
+        ]
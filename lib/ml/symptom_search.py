@@ -0,0 +1,206 @@
+"""Autocomplete and fuzzy lookup over the symptom vocabulary.
+
+Symptom keys are matched after normalization: lowercase, with every run of
+spaces, underscores and punctuation turned into a single underscore, so
+"Foul smell of urine", "foul_smell_of urine" and "FOUL-SMELL-OF-URINE" are
+the same term. Lay synonyms ("throwing up", "diarrhea") are indexed as
+extra terms of the symptom they stand for.
+
+- complete(): a prefix trie over every term and every word suffix of a term
+  (so "urine" completes "dark_urine" and "foul_smell_of urine"), with the
+  ranked completions precomputed at each node; a lookup walks the prefix
+  and slices a list.
+- resolve(): exact or synonym match of the normalized text, else the term
+  sharing the most character trigrams (Dice coefficient), for typos.
+"""
+import re
+from collections import Counter
+
+# Common lay terms for vocabulary symptoms. Entries whose target is not in
+# the vocabulary are ignored.
+DEFAULT_SYNONYMS = {
+    "fever": "high_fever",
+    "temperature": "high_fever",
+    "low_grade_fever": "mild_fever",
+    "tired": "fatigue",
+    "exhaustion": "fatigue",
+    "throwing_up": "vomiting",
+    "puking": "vomiting",
+    "feeling_sick": "nausea",
+    "diarrhea": "diarrhoea",
+    "stomach_ache": "stomach_pain",
+    "stomachache": "stomach_pain",
+    "belly_ache": "belly_pain",
+    "heartburn": "acidity",
+    "shortness_of_breath": "breathlessness",
+    "short_of_breath": "breathlessness",
+    "sneezing": "continuous_sneezing",
+    "rash": "skin_rash",
+    "itchy": "itching",
+    "itchiness": "itching",
+    "stuffy_nose": "congestion",
+    "blocked_nose": "congestion",
+    "sore_throat": "throat_irritation",
+    "dizzy": "dizziness",
+    "vertigo": "spinning_movements",
+    "jaundice": "yellowish_skin",
+    "yellow_eyes": "yellowing_of_eyes",
+    "losing_weight": "weight_loss",
+    "no_appetite": "loss_of_appetite",
+    "frequent_urination": "polyuria",
+    "painful_urination": "burning_micturition",
+    "burning_urination": "burning_micturition",
+    "blood_in_stool": "bloody_stool",
+    "racing_heart": "fast_heart_rate",
+    "rapid_heartbeat": "fast_heart_rate",
+    "joint_ache": "joint_pain",
+    "muscle_ache": "muscle_pain",
+    "body_ache": "muscle_pain",
+    "shaking": "shivering",
+    "sweats": "sweating",
+    "constipated": "constipation",
+    "bloating": "distention_of_abdomen",
+    "gas": "passage_of_gases",
+    "blurry_vision": "blurred_and_distorted_vision",
+    "blurred_vision": "blurred_and_distorted_vision",
+    "red_eyes": "redness_of_eyes",
+    "watery_eyes": "watering_from_eyes",
+    "anxious": "anxiety",
+    "depressed": "depression",
+    "confusion": "altered_sensorium",
+    "swollen_glands": "swelled_lymph_nodes",
+    "swollen_lymph_nodes": "swelled_lymph_nodes",
+    "coughing_blood": "blood_in_sputum",
+}
+
+# Completions kept per trie node
+MAX_COMPLETIONS = 50
+
+_SEPARATORS = re.compile(r'[^a-z0-9.]+')
+
+
+def normalize_symptom(text):
+    """Lowercase snake_case form of a symptom name, e.g. 'Foul smell of urine' -> 'foul_smell_of_urine'"""
+    return _SEPARATORS.sub('_', text.lower()).strip('_')
+
+
+def _trigrams(term):
+    padded = f"#{term}#"
+    return {padded[idx:idx + 3] for idx in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'completions')
+
+    def __init__(self):
+        self.children = {}
+        self.completions = []
+
+
+class SymptomSearchIndex:
+    """Prefix and fuzzy lookup of vocabulary symptoms"""
+
+    def __init__(self, symptoms, synonyms=None):
+        self.symptoms = list(symptoms)
+        synonyms = DEFAULT_SYNONYMS if synonyms is None else synonyms
+
+        # normalized term -> symptom; a symptom's own name wins over a synonym
+        self.terms = {}
+        for symptom in self.symptoms:
+            self.terms.setdefault(normalize_symptom(symptom), symptom)
+        self.synonyms = {}
+        self._known = set(self.symptoms)
+        for synonym, symptom in synonyms.items():
+            term = normalize_symptom(synonym)
+            if symptom in self._known and term not in self.terms:
+                self.terms[term] = symptom
+                self.synonyms[term] = symptom
+
+        self._root = _TrieNode()
+        for term, symptom in self.terms.items():
+            # Rank 0: the term starts with the prefix; rank 1: a later word does
+            is_synonym = term in self.synonyms
+            self._insert(term, (0, is_synonym, term, symptom))
+            for match in re.finditer('_', term):
+                self._insert(term[match.end():], (1, is_synonym, term, symptom))
+        self._finalize(self._root)
+
+        self._term_list = list(self.terms)
+        self._term_trigrams = [len(_trigrams(term)) for term in self._term_list]
+        self._postings = {}
+        for term_id, term in enumerate(self._term_list):
+            for gram in _trigrams(term):
+                self._postings.setdefault(gram, []).append(term_id)
+
+    def _insert(self, key, entry):
+        node = self._root
+        node.completions.append(entry)
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            node.completions.append(entry)
+
+    def _finalize(self, root):
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            seen = set()
+            ranked = []
+            # Whole-term matches first, own names before synonyms, then alphabetical; each symptom once
+            for _, _, _, symptom in sorted(node.completions):
+                if symptom not in seen:
+                    seen.add(symptom)
+                    ranked.append(symptom)
+                    if len(ranked) >= MAX_COMPLETIONS:
+                        break
+            node.completions = ranked
+            stack.extend(node.children.values())
+
+    def complete(self, prefix, limit=10):
+        """Symptoms whose name, a word of it or a synonym starts with prefix, best first.
+
+        Falls back to fuzzy matches when the prefix matches nothing.
+        """
+        key = normalize_symptom(prefix)
+        if not key:
+            return []
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return [symptom for symptom, _ in self.fuzzy(key, limit)]
+        return node.completions[:limit]
+
+    def fuzzy(self, text, limit=5, min_score=0.5):
+        """(symptom, score) pairs of the terms most similar to text by trigram Dice coefficient"""
+        key = normalize_symptom(text)
+        grams = _trigrams(key)
+        if not key or not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+
+        best = {}
+        for term_id, common in shared.items():
+            score = 2.0 * common / (len(grams) + self._term_trigrams[term_id])
+            symptom = self.terms[self._term_list[term_id]]
+            if score >= min_score and score > best.get(symptom, 0):
+                best[symptom] = score
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def resolve(self, text, min_score=0.5):
+        """Best vocabulary match for text as {"symptom", "score", "match"}, or None.
+
+        match is "exact" (same name after normalization), "synonym" or "fuzzy".
+        """
+        if text in self._known:
+            return {"symptom": text, "score": 1.0, "match": "exact"}
+        key = normalize_symptom(text)
+        symptom = self.terms.get(key)
+        if symptom is not None:
+            return {"symptom": symptom, "score": 1.0, "match": "synonym" if key in self.synonyms else "exact"}
+        matches = self.fuzzy(key, 1, min_score)
+        if matches:
+            symptom, score = matches[0]
+            return {"symptom": symptom, "score": score, "match": "fuzzy"}
+        return None
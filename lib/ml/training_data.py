@@ -0,0 +1,251 @@
+"""Deduplicated, bit-packed form of one-hot training data.
+
+Training.csv stores every case as a text row of 0/1 symptom columns and
+repeats identical cases many times. TrainingData.from_csv parses such a
+file once and collapses identical (symptoms, prognosis) rows into unique
+patterns, each counted as a sample weight:
+
+- patterns: one row of np.packbits bits per unique pattern (a bit per column)
+- labels: int32 code of each pattern's prognosis into the sorted classes
+- weights: uint32 number of rows that had the pattern
+
+Patterns keep the order of their first occurrence, so a file without
+duplicates gives back its rows in order with unit weights and a weighted
+fit on it matches a plain fit on the CSV.
+
+save() writes the same binary layout as the knowledge base snapshot: an
+8 byte magic, a little-endian uint32 header length, a JSON header (columns,
+classes, source file stamp, section offsets) and 8-byte aligned sections.
+"""
+import csv
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from kb_snapshot import is_source_fresh, source_stamp
+
+MAGIC = b'MMTRAIN1'
+FORMAT_VERSION = 1
+
+# CSV rows parsed and deduplicated per block
+CHUNK_ROWS = 8192
+
+
+def deduplicate(patterns, labels, weights=None):
+    """(patterns, labels, weights) of the unique (pattern, label) rows, in order of first occurrence.
+
+    weights (one per row, default 1) of repeated rows add up.
+    """
+    if not len(labels):
+        return patterns, labels, np.zeros(0, dtype=np.uint32)
+    keys = np.concatenate([patterns, labels.astype('>i4').view(np.uint8).reshape(-1, 4)], axis=1)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    # np.unique sorts the keys; renumber them by first occurrence
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    counts = np.bincount(rank[inverse.ravel()], weights=weights, minlength=len(order))
+    rows = first[order]
+    return patterns[rows], labels[rows], np.rint(counts).astype(np.uint32)
+
+
+class TrainingData:
+    """Unique one-hot patterns of a training set with label codes and sample weights"""
+
+    def __init__(self, columns, classes, patterns, labels, weights, source=None):
+        self.columns = list(columns)
+        self.classes = list(classes)
+        self.patterns = patterns
+        self.labels = labels
+        self.weights = weights
+        # Stamp of the CSV the data was compiled from (see kb_snapshot.source_stamp)
+        self.source = source
+
+    @classmethod
+    def from_rows(cls, columns, X, labels, source=None):
+        """Deduplicate a dense 0/1 matrix with one label per row"""
+        classes = sorted(set(labels))
+        class_index = {label: code for code, label in enumerate(classes)}
+        codes = np.array([class_index[label] for label in labels], dtype=np.int32)
+        patterns, codes, weights = deduplicate(np.packbits(np.asarray(X) != 0, axis=1), codes)
+        return cls(columns, classes, patterns, codes, weights, source)
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        """Parse a one-hot CSV with a prognosis column, deduplicating as it goes"""
+        with open(csv_path, 'r', newline='') as f:
+            csv_reader = csv.reader(f)
+            header = [column.strip() for column in next(csv_reader)]
+            label_col = header.index('prognosis')
+            feature_cols = [idx for idx, column in enumerate(header) if column and idx != label_col]
+
+            class_index = {}
+            blocks = []
+            rows = []
+            codes = []
+
+            def flush():
+                values = np.array(rows, dtype=np.float64).reshape(len(rows), len(feature_cols))
+                blocks.append(deduplicate(np.packbits(values != 0, axis=1), np.array(codes, dtype=np.int32)))
+                rows.clear()
+                codes.clear()
+
+            for row in csv_reader:
+                if not row:
+                    continue
+                rows.append([row[idx] for idx in feature_cols])
+                codes.append(class_index.setdefault(row[label_col].strip(), len(class_index)))
+                if len(rows) >= CHUNK_ROWS:
+                    flush()
+            if rows or not blocks:
+                flush()
+
+        # Blocks are already unique; merge them and renumber classes in sorted order
+        patterns, codes, weights = deduplicate(
+            np.concatenate([block[0] for block in blocks]),
+            np.concatenate([block[1] for block in blocks]),
+            np.concatenate([block[2] for block in blocks])
+        )
+        classes = sorted(class_index)
+        recode = np.zeros(len(class_index), dtype=np.int32)
+        for label, code in class_index.items():
+            recode[code] = classes.index(label)
+        return cls(
+            [header[idx] for idx in feature_cols], classes, patterns, recode[codes], weights,
+            source_stamp(csv_path)
+        )
+
+    @property
+    def n_patterns(self):
+        return len(self.labels)
+
+    @property
+    def n_rows(self):
+        """Rows of the original data, i.e. the total weight"""
+        return int(self.weights.sum())
+
+    @property
+    def nbytes(self):
+        return self.patterns.nbytes + self.labels.nbytes + self.weights.nbytes
+
+    def matrix(self, dtype=np.float64):
+        """Dense 0/1 matrix of the unique patterns"""
+        return np.unpackbits(self.patterns, axis=1, count=len(self.columns)).astype(dtype)
+
+    def label_names(self):
+        """Prognosis of every pattern"""
+        return [self.classes[code] for code in self.labels.tolist()]
+
+    def symptom_lists(self):
+        """Present symptoms of every pattern"""
+        columns = self.columns
+        return [[columns[idx] for idx in np.flatnonzero(row)] for row in self.matrix(np.uint8)]
+
+    def subset(self, rows):
+        """The patterns at the given row indices (or boolean mask)"""
+        return TrainingData(
+            self.columns, self.classes, self.patterns[rows], self.labels[rows], self.weights[rows], self.source
+        )
+
+    def stratified_sample(self, max_patterns, rng):
+        """A sample of at most about max_patterns patterns with every class represented.
+
+        Each class gets an equal share of max_patterns (all of its patterns
+        if it has fewer), drawn with rng without replacement. The weights of
+        a subsampled class are scaled up so it keeps its total weight.
+        """
+        if self.n_patterns <= max_patterns:
+            return self
+        quota = max(1, max_patterns // len(self.classes))
+        rows = []
+        weights = []
+        for code in range(len(self.classes)):
+            members = np.flatnonzero(self.labels == code)
+            if len(members) > quota:
+                chosen = np.sort(rng.choice(members, quota, replace=False))
+                scale = self.weights[members].sum() / self.weights[chosen].sum()
+                weights.append(np.maximum(1, np.rint(self.weights[chosen] * scale)).astype(np.uint32))
+            else:
+                chosen = members
+                weights.append(self.weights[members])
+            rows.append(chosen)
+        rows = np.concatenate(rows)
+        # Keep the sample in first-occurrence order, like the full data
+        order = np.argsort(rows, kind='stable')
+        return TrainingData(
+            self.columns, self.classes, self.patterns[rows[order]], self.labels[rows[order]],
+            np.concatenate(weights)[order], self.source
+        )
+
+    def with_rows(self, X, labels):
+        """A copy with more rows (dense, over the same columns) deduplicated into it"""
+        classes = sorted(set(self.classes) | set(labels))
+        class_index = {label: code for code, label in enumerate(classes)}
+        recode = np.array([class_index[label] for label in self.classes], dtype=np.int32)
+        patterns, codes, weights = deduplicate(
+            np.concatenate([self.patterns, np.packbits(np.asarray(X) != 0, axis=1)]),
+            np.concatenate([recode[self.labels], np.array([class_index[label] for label in labels], dtype=np.int32)]),
+            np.concatenate([self.weights, np.ones(len(labels), dtype=np.uint32)])
+        )
+        return TrainingData(self.columns, classes, patterns, codes, weights, self.source)
+
+    def is_fresh(self, csv_path):
+        """Whether csv_path still has the content this data was compiled from"""
+        return self.source is not None and is_source_fresh(self.source, csv_path)
+
+    def save(self, path):
+        """Atomically write the data to path"""
+        sections = {
+            "patterns": np.ascontiguousarray(self.patterns, dtype=np.uint8),
+            "labels": np.ascontiguousarray(self.labels, dtype=np.int32),
+            "weights": np.ascontiguousarray(self.weights, dtype=np.uint32),
+        }
+        layout = {}
+        payload = bytearray()
+        for name, data in sections.items():
+            payload += b'\0' * (-len(payload) % 8)
+            layout[name] = [len(payload), data.nbytes, data.dtype.str, list(data.shape)]
+            payload += data.tobytes()
+
+        header = json.dumps({
+            "format": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "columns": self.columns,
+            "classes": self.classes,
+            "source": self.source,
+            "sections": layout
+        }).encode('utf-8')
+        prefix = MAGIC + struct.pack('<I', len(header)) + header
+        prefix += b'\0' * (-len(prefix) % 8)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(prefix)
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            content = f.read()
+        if content[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compiled training data file")
+        (header_len,) = struct.unpack_from('<I', content, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(content[header_start:header_start + header_len].decode('utf-8'))
+        if header.get("format") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path} was written in an incompatible format")
+
+        data_start = header_start + header_len
+        data_start += -data_start % 8
+        sections = {}
+        for name, (offset, length, dtype, shape) in header["sections"].items():
+            start = data_start + offset
+            sections[name] = np.frombuffer(content, dtype=dtype, count=length // np.dtype(dtype).itemsize,
+                                           offset=start).reshape(shape)
+        return cls(header["columns"], header["classes"], sections["patterns"], sections["labels"],
+                   sections["weights"], header["source"])